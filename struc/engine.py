@@ -0,0 +1,203 @@
+import struct
+from functools import lru_cache
+from typing import Any, Optional, cast, get_type_hints
+
+from struc2 import DV as DV2, DTR as DTR2
+from struc2.defs import Endian as Endian2
+from struc2.Registry import TypeRegistry
+from struc2.Serialized import Buffer, Reader, Serialized, SerializedDecoder, SerializedFactory, Truncated
+from struc2.SerializedImpl import SerializedSimple, SerializedString
+from struc2.TagParser import TagType
+
+from .Dynamic import DynamicTypeResolution
+from .Serializable import DynamicValue, Serializable, SerializableFactory, _ArraySerializable, _SimpleSerializable
+from .defs import Endian
+from .register import TypeRegister
+
+# legacy tags are translated to struc2 decoders once per class, legacy structs decode on struc2's engine.
+# Built-in and GenericSeril types map to struc2 types, other Serializables run through an adapter
+
+
+class _Simple(SerializedSimple[Any]):
+    @classmethod
+    def create(cls, *args: Any, **kwargs: Any) -> Serialized[Any]:
+        return super().create(*[_endian(a) for a in args], **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _simple(legacy: type) -> type:
+    return type(legacy.__name__, (_Simple,), {"struct_type": legacy.struct_fmt, "struct_type_size": legacy.data_len})
+
+
+def _endian(arg: Any) -> Any:
+    return Endian2[arg.name] if isinstance(arg, Endian) else arg
+
+
+# legacy cstrings raised ValueError when unterminated, struc2's raise struct.error: this is both
+class _Unterminated(Truncated, ValueError):
+    pass
+
+
+class _CString(SerializedString):
+    def _find_end(self, buffer: Buffer, offset: int) -> int:
+        try:
+            return super()._find_end(buffer, offset)
+        except Truncated as e:
+            raise _Unterminated(*e.args) from None
+
+
+# struc2 types standing in for the legacy types of the same name
+_REPLACED: dict[str, type] = {"cstring": _CString}
+
+
+# struc2 decoder seen as a legacy Serializable, for custom types composing other types
+class _AsLegacy(Serializable[Any]):
+    def __init__(self, ser: SerializedDecoder[Any]):
+        self.ser = ser
+
+    def _from_bytes(self, byte_array: bytes) -> tuple[Any, int]:
+        return self.ser._unpack_from(memoryview(byte_array).cast("B"), 0, None)
+
+    def __bytes__(self) -> bytes:
+        raise NotImplementedError
+
+
+# bytes a legacy Serializable always takes, None when it depends on the data
+def _legacy_size(legacy: Any) -> Optional[int]:
+    if isinstance(legacy, _AsLegacy):
+        return legacy.ser._size()
+    if isinstance(legacy, _SimpleSerializable):
+        return legacy.data_len
+    if isinstance(legacy, DynamicValue):
+        return _legacy_size(legacy.ser)
+    if isinstance(legacy, _ArraySerializable):
+        size = _legacy_size(legacy.ser)
+        return None if size is None else size * legacy.length
+    return None
+
+
+class _Adapter(SerializedFactory[Any]):
+    # legacy Serializable built from `make(inner, *args)` once composed, else `make(*args)` when first used
+    _legacy: Optional[Serializable[Any]] = None
+
+    def __init__(self, make: Any, args: tuple[Any, ...]):
+        self._make = make
+        self._args = args
+
+    def _get(self) -> Serializable[Any]:
+        if self._legacy is None:
+            self._legacy = self._make(*self._args)
+        return cast(Serializable[Any], self._legacy)
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        return self._get()._from_bytes(bytes(buffer[offset:]))
+
+    # fixed size types read just their bytes. Others are decoded from reads twice as long each time
+    # they fail, the stream is then moved back to the end of what was decoded
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        legacy = self._get()
+        size = _legacy_size(legacy)
+        if size is not None:
+            data = stream.read(size)
+            if len(data) < size:
+                raise Truncated(f"unpack requires a buffer of {size} bytes")
+            return legacy._from_bytes(data)
+        if not stream.seekable():
+            raise ValueError(f"`{type(legacy).__name__}` decodes bytes only, the stream must be seekable")
+        pos = stream.tell()
+        data = b""
+        n = 64
+        while True:
+            chunk = stream.read(n - len(data))
+            data += chunk
+            try:
+                value, size = legacy._from_bytes(data)
+            except (ValueError, IndexError, struct.error):
+                if not chunk:
+                    raise
+                n *= 2
+                continue
+            stream.seek(pos + size)
+            return value, size
+
+    def _size(self) -> Optional[int]:
+        return _legacy_size(self._get())
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._legacy = self._make(_AsLegacy(ser), *self._args)
+
+
+def _adapter(make: Any) -> type:
+    class Adapter(SerializedFactory[Any]):
+        @classmethod
+        def create(cls, *args: Any, **kwargs: Any) -> Serialized[Any]:
+            return _Adapter(make, args) # type: ignore
+    return Adapter
+
+
+@lru_cache(maxsize=None)
+def _registered(legacy: type) -> type:
+    name = getattr(legacy, "_struc2_name", None)
+    if name is not None:
+        return _REPLACED.get(name) or TypeRegistry.get_type(name)
+    if issubclass(legacy, _SimpleSerializable) and legacy._from_bytes is _SimpleSerializable._from_bytes:
+        return _simple(legacy)
+    return _adapter(legacy)
+
+
+class _LegacyResolution(type(DTR2[None].create())): # type: ignore
+    # legacy DTR functions get the type they're composed with, seen as a legacy Serializable, before
+    # the tag's arguments, and their tags replace it
+    def __init__(self, action: Any, args: tuple[Any, ...]):
+        self._args = args
+        super().__init__(lambda inst: translate(action(inst, *self._args)))
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._args = (_AsLegacy(ser), *self._args)
+
+
+def _dtr(dtr: DynamicTypeResolution) -> type:
+    class Resolved(SerializedFactory[Any]):
+        @classmethod
+        def create(cls, *args: Any, **kwargs: Any) -> Serialized[Any]:
+            return _LegacyResolution(dtr.action, args) # type: ignore
+    return Resolved
+
+
+def _param(p: Any) -> Any:
+    if isinstance(p, str):
+        legacy = getattr(TypeRegister, p, None)
+        if legacy is None:
+            raise ValueError(f"Undefined type {p}. If you defined type, don't forget to @register_type")
+        return _registered(legacy)
+    if isinstance(p, DynamicTypeResolution):
+        return _dtr(p)
+    if isinstance(p, SerializableFactory):
+        process_value = getattr(p, "process_value", None)
+        return DV2[process_value] if process_value is not None else _adapter(p)
+    return p
+
+
+# legacy tag list, as written in annotations or returned by a DTR function, as a struc2 decoder
+def translate(tags: list[Any]) -> Optional[Serialized[Any]]:
+    try:
+        return _translate_cached(tuple(tags))
+    except TypeError: # unhashable argument
+        return _translate(tuple(tags))
+
+
+def _translate(tags: tuple[Any, ...]) -> Serialized[Any]:
+    return TagType.parse_tags(tuple(_param(p) for p in tags)).ser
+
+
+# DTR functions usually return one of a few tag lists, DV lambdas made per call make the others unique
+_translate_cached = lru_cache(maxsize=256)(_translate)
+
+
+def fields(cls: type) -> list[tuple[str, Serialized[Any]]]:
+    tags = list[tuple[str, Serialized[Any]]]()
+    for var, ann in get_type_hints(cls, include_extras=True).items():
+        metadata = getattr(ann, "__metadata__", None)
+        if metadata is not None and metadata[0] != "ignore":
+            tags.append((var, _translate(metadata)))
+    return tags
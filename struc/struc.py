@@ -1,17 +1,14 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-import struc
 
 
 from typing import (
     Callable,
-    Generator,
-    Optional,
     Type,
     TypeVar,
     Any,
     Union,
-    get_type_hints,
+    cast,
 )
 from .Serializable import (
     Serializable,
@@ -23,6 +20,8 @@ from .Serializable import (
 from .register import TypeRegister, register_type
 from .defs import *
 from .Dynamic import DynAction, DynamicTypeResolution
+from . import engine
+import struc2
 
 
 @register_type
@@ -98,6 +97,7 @@ U = TypeVar("U")
 @register_type
 class _sized_array(ArraySeril[list[T], T]):  # type: ignore
     _name = "[]"
+    _struc2_name = "[]"
 
     @staticmethod
     def transform(arr: list[T]) -> list[T]:
@@ -106,6 +106,7 @@ class _sized_array(ArraySeril[list[T], T]):  # type: ignore
 
 @register_type
 class cstring(ArraySeril[bytes, bytes]):
+    _struc2_name = "cstring"
     _dynamic: bool
     length = 0
     stop_char = b"\0"
@@ -148,7 +149,9 @@ class DV:
         def DynamicFactory(ser: Serializable[T]) -> DynamicValue[T, U]:
             return DynamicValue(ser, param)  # type: ignore
 
-        return SerializableFactory(DynamicFactory)
+        factory = SerializableFactory(DynamicFactory)
+        factory.process_value = param  # type: ignore
+        return factory
 
 
 class StructBase(ABC):
@@ -169,123 +172,16 @@ TagBaseType = Union[
 ]
 BaseType = Union[Serializable[Any], DynamicTypeResolution, Type[StructBase]]
 
-def is_tag(t: type) -> bool:
-    tag_t = type(struc.Tag[int, ...])
-    return t is tag_t
-
-class Struct(StructBase):
-    _cached_fields: Optional[list[tuple[str, BaseType]]] = None
-
-    @staticmethod
-    def find_type_and_args(
-        tags: list[Any],
-    ) -> Generator[tuple[TagBaseType, list[Any]], None, None]:
-        # example
-        # array of 5 i32 little-endian
-        # 5,     '[]', LittleEndian, 'i32'
-        #             |_____1.args_____1_|
-        # 2.args  2   |_____2.ser________|
-
-        def is_base(tag: Any) -> bool:
-            if not isinstance(tag, type):
-                return (
-                    isinstance(tag, str)
-                    or isinstance(tag, DynamicTypeResolution)
-                    or isinstance(tag, SerializableFactory)
-                )
-            else:
-                return issubclass(tag, Struct)
-
-        def validate_base(tag: Any):
-            if not is_base(tag):
-                raise ValueError(f"Tag must end with a generic type. But got {tags[0]}")
-
-        tags.reverse()
-        validate_base(tags[0])
-
-        while tags:
-            typ_name = tags[0]
-            typ_args: list[Any] = []
-            for i, tag in enumerate(tags[1:], 1):
-                if is_base(tag):
-                    tags = tags[i:]  # advance tags
-                    break
-                typ_args.append(tag)
-            else:
-                yield (typ_name, typ_args)
-                break  # tags end is reached, stop generator
-            yield (typ_name, typ_args)
-
-    @staticmethod
-    def type_from_tags(tags: list[Any]) -> BaseType:
-        def make_type(type_name: TagBaseType, *type_args: Any) -> BaseType:
-            if isinstance(type_name, DynamicTypeResolution):
-                type_name.set_args(*type_args)
-                return type_name
-            elif isinstance(type_name, str):
-                type_ = TypeRegister.get_type(type_name)
-                if type_ is None:
-                    raise ValueError(
-                        f"Undefined type {type_name}. If you defined type, don't forget to @register_type"
-                    )
-                return type_(*type_args)
-            elif isinstance(type_name, SerializableFactory):
-                return type_name(*type_args)
-            elif issubclass(type_name, StructBase):  # type: ignore
-                return type_name
-
-
-        typ_data_parser = Struct.find_type_and_args(tags)
-        # unfold following loop for a iteration
-        type_name, type_args = next(typ_data_parser)
-
-        ser = make_type(type_name, *type_args)
-
-        for type_name, type_args in typ_data_parser:
-            ser = make_type(type_name, ser, *type_args)
-        return ser
-
-    # MUST NOT BE RECURSIVE BECAUSE RESULT IS ULTIMATELY CACHED
+# legacy tags are translated to struc2 decoders (see `engine`), records are decoded by struc2
+class Struct(StructBase, struc2.Struct):
     @classmethod
-    def _get_fields(cls) -> list[tuple[str, BaseType]]:
-        if cls._cached_fields is not None:
-            return cls._cached_fields
-
-        annotations: list[tuple[str, BaseType]] = []
-        for var, ann in get_type_hints(cls, include_extras=True).items():
-            if is_tag(type(ann)):
-                tags = list(ann.__metadata__)
-                if tags[0] != 'ignore':
-                    typ = Struct.type_from_tags(tags)
-                    annotations.append((var, typ))
-        cls._cached_fields = annotations
-        return cls._cached_fields
-
-    def dynamic_extract(
-        self, typ: DynamicTypeResolution, bytes_array: bytes
-    ) -> tuple[Any, int]:
-        tags = typ(self)
-        return self.extract(Struct.type_from_tags(tags), bytes_array)
-
-    def extract(self, typ: BaseType, bytes_array: bytes) -> tuple[Any, int]:
-        if isinstance(typ, DynamicTypeResolution):
-            return self.dynamic_extract(typ, bytes_array)
-        elif isinstance(typ, Serializable):
-            return typ._from_bytes(bytes_array)
-        elif issubclass(typ, StructBase):  # type: ignore
-            return typ.unpack_sized(bytes_array)
+    def _get_tags_(cls) -> list[tuple[str, Any]]:
+        return engine.fields(cls)
 
     @classmethod
     def unpack_sized(cls: Type[S], bytes_array: bytes) -> tuple[S, int]:
         s = cls()
-        fields = s._get_fields()
-        sum_processed = 0
-        for var, typ in fields:
-            val, processed_len = s.extract(typ, bytes_array)
-            setattr(s, var, val)
-            bytes_array = bytes_array[processed_len:]
-            sum_processed += processed_len
-        return s, sum_processed
+        return cast(tuple[S, int], s._unpack_from(memoryview(bytes_array).cast("B"), 0, s))
 
     # It is not how i must've done this, but i probably will rework the lib
     @classmethod
@@ -0,0 +1,24 @@
+from typing import Any, Optional
+
+# numpy is optional: vectorized paths are used when it can be imported, results stay plain lists
+
+_numpy: Any = None
+_tried = False
+
+# arrays shorter than this aren't worth the conversion
+NUMPY_MIN_LENGTH = 64
+
+# struct codes numpy reads with the same meaning
+NUMERIC_CODES = frozenset("bBhHiIqQfd")
+
+
+def numpy() -> Optional[Any]:
+    global _numpy, _tried
+    if not _tried:
+        _tried = True
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy = np
+    return _numpy
@@ -0,0 +1,168 @@
+import struct
+import time
+from typing import Any, Callable, Optional
+
+from .Serialized import Buffer, Serialized
+from .SerializedImpl import SerializedSimple
+from .Native import SerializedPadded
+from .Checksum import checksums
+
+# strategies decoding a whole record from a buffer, all giving the same records. A struct uses the
+# one named by its `_backend`, else the one `calibrate` found fastest for it, else "interpreted".
+# Nested structs are always decoded field by field by their parent's backend
+
+Tags = list[tuple[str, Serialized[Any]]]
+# (buffer, offset) -> (record, size)
+RecordDecode = Callable[[Buffer, int], tuple[Any, int]]
+
+DEFAULT_BACKEND = "interpreted"
+
+
+class Backend:
+    name: str
+    eligible: Callable[[type], bool]
+    build: Callable[[type], RecordDecode]
+
+    def __init__(self, name: str, eligible: Callable[[type], bool], build: Callable[[type], RecordDecode]):
+        self.name = name
+        self.eligible = eligible
+        self.build = build
+
+    def __repr__(self) -> str:
+        return f"Backend({self.name!r})"
+
+
+_BACKENDS: dict[str, Backend] = {}
+
+
+def register_backend(name: str, eligible: Callable[[type], bool] = lambda cls: True):
+    def register(build: Callable[[type], RecordDecode]) -> Callable[[type], RecordDecode]:
+        _BACKENDS[name] = Backend(name, eligible, build)
+        return build
+    return register
+
+
+def get_backend(name: str) -> Backend:
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown decode backend `{name}`")
+    return backend
+
+
+def backends() -> list[str]:
+    return list(_BACKENDS)
+
+
+def eligible(cls: type) -> list[str]:
+    return [name for name, backend in _BACKENDS.items() if backend.eligible(cls)]
+
+
+def _unchecked(cls: type) -> bool:
+    return not checksums(cls._get_tags()) # type: ignore
+
+
+# struct format code of a plain number field, with its padding, None for other fields
+def _code(t: Any) -> Optional[tuple[str, str]]:
+    before = after = 0
+    if isinstance(t, SerializedPadded):
+        t, before, after = t._ser, t.before, t.after
+    if not isinstance(t, SerializedSimple):
+        return None
+    return t._endian.value, f"{before}x{t.struct_type}{after}x" if before or after else t.struct_type
+
+
+# consecutive plain number fields of the same byte order as one struct.Struct: (struct, names) runs
+# and (None, [name], tag) single fields
+def plan(tags: Tags) -> list[tuple[Optional[struct.Struct], list[str], Any]]:
+    steps = list[tuple[Optional[struct.Struct], list[str], Any]]()
+    run_endian, run_codes, run_names = "", list[str](), list[str]()
+
+    def close() -> None:
+        if run_names:
+            steps.append((struct.Struct(run_endian + "".join(run_codes)), list(run_names), None))
+            run_codes.clear()
+            run_names.clear()
+
+    for var, t in tags:
+        code = _code(t)
+        if code is None:
+            close()
+            steps.append((None, [var], t))
+            continue
+        if code[0] != run_endian:
+            close()
+            run_endian = code[0]
+        run_codes.append(code[1])
+        run_names.append(var)
+    close()
+    return steps
+
+
+@register_backend("interpreted")
+def interpreted(cls: type) -> RecordDecode:
+    i = cls()
+    return lambda buffer, offset: i._unpack_from(buffer, offset, i)
+
+
+# runs of plain number fields decoded by one struct call each
+@register_backend("fused", lambda cls: _unchecked(cls) and any(s is not None for s, _, _ in plan(cls._get_tags()))) # type: ignore
+def fused(cls: type) -> RecordDecode:
+    steps = plan(cls._get_tags()) # type: ignore
+
+    def decode(buffer: Buffer, offset: int) -> tuple[Any, int]:
+        this = cls()
+        values = this.__dict__
+        start = offset
+        for s, names, t in steps:
+            if s is not None:
+                values.update(zip(names, s.unpack_from(buffer, offset)))
+                offset += s.size
+            else:
+                field, size = t._unpack_from(buffer, offset, this)
+                values[names[0]] = field
+                offset += size
+        return this, offset - start
+    return decode
+
+
+# the same plan unrolled into generated straight line code
+@register_backend("codegen", _unchecked)
+def codegen(cls: type) -> RecordDecode:
+    namespace: dict[str, Any] = {"cls": cls}
+    lines = ["def decode(buffer, offset):", "    this = cls()", "    start = offset"]
+    for n, (s, names, t) in enumerate(plan(cls._get_tags())): # type: ignore
+        if s is not None:
+            namespace[f"_s{n}"] = s
+            targets = "".join(f"this.{name}, " for name in names)
+            lines.append(f"    {targets}= _s{n}.unpack_from(buffer, offset)")
+            lines.append(f"    offset += {s.size}")
+        else:
+            namespace[f"_t{n}"] = t
+            lines.append(f"    this.{names[0]}, size = _t{n}._unpack_from(buffer, offset, this)")
+            lines.append("    offset += size")
+    lines.append("    return this, offset - start")
+    exec(compile("\n".join(lines), f"<struc2 decoder for {cls.__name__}>", "exec"), namespace)
+    return namespace["decode"]
+
+
+# seconds per record of every eligible backend decoding `sample`, best of `rounds` runs of `number`.
+# Backends decoding the sample to a record packing differently from "interpreted"'s are left out,
+# "interpreted" itself is always timed
+def calibrate(cls: type, sample: Buffer, number: int, rounds: int = 3) -> dict[str, float]:
+    expected, expected_size = interpreted(cls)(sample, 0)
+    packed = expected.pack()
+    timings = dict[str, float]()
+    for name in eligible(cls):
+        decode = get_backend(name).build(cls)
+        if name != "interpreted":
+            record, size = decode(sample, 0)
+            if size != expected_size or record.pack() != packed:
+                continue
+        best = float("inf")
+        for _ in range(rounds):
+            began = time.perf_counter()
+            for _ in range(number):
+                decode(sample, 0)
+            best = min(best, time.perf_counter() - began)
+        timings[name] = best / number
+    return timings
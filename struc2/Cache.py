@@ -0,0 +1,63 @@
+import copy
+from collections import OrderedDict
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _copy(value: Any) -> Any:
+    # lists, dicts and nested structs are copied all the way down, other mutable values shallowly
+    if isinstance(value, (int, float, str, bytes, tuple, type(None))):
+        return value
+    t = type(value)
+    if t is list:
+        return [_copy(v) for v in value]
+    if t is dict:
+        return {k: _copy(v) for k, v in value.items()}
+    if hasattr(t, "_get_tags"):
+        copied = object.__new__(t)
+        copied.__dict__.update({k: _copy(v) for k, v in value.__dict__.items()})
+        return copied
+    return copy.copy(value)
+
+
+class DecodeCache(Generic[T]):
+    # records decoded from identical bytes, least recently used ones are evicted past `maxsize`.
+    # Callers get a deep copy of the cached record, changing it never changes the cached one
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict[bytes, T]()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: bytes, decode: Callable[[bytes], T]) -> T:
+        records = self._records
+        record = records.get(key)
+        if record is None:
+            self.misses += 1
+            record = records[key] = decode(key)
+            if len(records) > self.maxsize:
+                records.popitem(last=False)
+        else:
+            self.hits += 1
+            records.move_to_end(key)
+        return _copy(record)
+
+    def clear(self) -> None:
+        self._records.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,227 @@
+import binascii
+import zlib
+from typing import Any, Callable, Generic, Optional, Union
+
+from .Serialized import AsyncReader, Buffer, Reader, RetT, Serialized, SerializedDecoder, SerializedFactory
+from .Dynamic import serialized_dynamic
+
+# update(data, value) -> value, data is any bytes-like object so buffers are never copied
+Update = Callable[[Any, int], int]
+
+
+def _crc16_table(poly: int) -> list[int]:
+    table = list[int]()
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_MODBUS_TABLE = _crc16_table(0xA001)
+
+
+def _crc16_modbus(data: Any, crc: int) -> int:
+    table = _CRC16_MODBUS_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _sum8(data: Any, value: int) -> int:
+    return (value + sum(data)) & 0xFF
+
+
+# name -> (initial value, update)
+ALGORITHMS: dict[str, tuple[int, Update]] = {
+    "crc32": (0, zlib.crc32),
+    "crc16": (0xFFFF, binascii.crc_hqx), # CRC-16/CCITT-FALSE, table driven in C
+    "crc16-xmodem": (0, binascii.crc_hqx),
+    "crc16-modbus": (0xFFFF, _crc16_modbus),
+    "sum8": (0, _sum8),
+}
+
+# attribute set on records whose checksums are only flagged
+CHECKSUM_VALID = "checksum_valid"
+
+
+class ChecksumError(ValueError):
+    def __init__(self, field: str, expected: int, computed: int):
+        super().__init__(f"Checksum mismatch in `{field}`: stored {expected:#x}, computed {computed:#x}")
+        self.field = field
+        self.expected = expected
+        self.computed = computed
+
+
+class ChecksumSerialized(SerializedFactory[int], Generic[RetT]):
+    # params: algorithm name, optionally a slice of record offsets covered (stop defaults to the
+    # offset of the checksum field itself) and `False` to flag mismatches instead of raising
+    algorithm: str
+    start: int
+    stop: Optional[int]
+    strict: bool
+    _init: int
+    _update: Update
+    _ser: SerializedDecoder[int]
+
+    def __init__(self, params: Union[str, tuple[Any, ...]]):
+        if isinstance(params, str):
+            params = (params,)
+        self.algorithm, covered, self.strict = params + (None, slice(None), True)[len(params):]
+        if self.algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown checksum algorithm `{self.algorithm}`")
+        self._init, self._update = ALGORITHMS[self.algorithm]
+        self.start = covered.start or 0
+        self.stop = covered.stop
+
+    def compute(self, data: Any) -> int:
+        return self._update(data, self._init)
+
+    def verify(self, this: Any, field: str, expected: int, computed: int) -> None:
+        if self.strict:
+            if expected != computed:
+                raise ChecksumError(field, expected, computed)
+        else:
+            setattr(this, CHECKSUM_VALID, getattr(this, CHECKSUM_VALID, True) and expected == computed)
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[int, int]:
+        return self._ser._unpack(stream, instance)
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[int, int]:
+        return await self._ser._unpack_async(stream, instance)
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[int, int]:
+        return self._ser._unpack_from(buffer, offset, instance)
+
+    def _size(self) -> Optional[int]:
+        return self._ser._size()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance)
+
+    # the stored value is packed as is, it isn't recomputed
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return self._ser._pack(value, instance)
+
+    def _compose(self, ser: SerializedDecoder[int]) -> None:
+        self._ser = ser
+
+
+Checksum = serialized_dynamic(ChecksumSerialized)
+
+Tags = list[tuple[str, Serialized[Any]]]
+
+
+class _Tap:
+    # updates running checksums with the bytes a record is decoded from, as they are read
+    pos: int
+
+    def __init__(self, checksums: list[ChecksumSerialized[Any]]):
+        self.pos = 0
+        # checksum -> [value, stop], stop is None until the checksum field is reached
+        self.running = {id(c): [c._init, c.stop] for c in checksums}
+        self.checksums = checksums
+
+    def close(self, checksum: ChecksumSerialized[Any]) -> None:
+        state = self.running[id(checksum)]
+        if state[1] is None:
+            state[1] = self.pos
+
+    def value(self, checksum: ChecksumSerialized[Any]) -> int:
+        return self.running[id(checksum)][0]
+
+    def feed(self, data: bytes) -> bytes:
+        pos, n = self.pos, len(data)
+        view = memoryview(data)
+        for c in self.checksums:
+            state = self.running[id(c)]
+            lo = max(c.start - pos, 0)
+            hi = n if state[1] is None else min(state[1] - pos, n)
+            if hi > lo:
+                state[0] = c._update(view[lo:hi], state[0])
+        self.pos = pos + n
+        return data
+
+
+class _TapReader(_Tap):
+    # reads feed the checksums, peeks don't: what's peeked is fed once it's read
+    def __init__(self, stream: Reader, checksums: list[ChecksumSerialized[Any]]):
+        super().__init__(checksums)
+        self._stream = stream
+        if (peek := getattr(stream, "peek", None)) is not None:
+            self.peek = peek
+
+    def read(self, n: int = -1) -> bytes:
+        return self.feed(self._stream.read(n))
+
+    def seekable(self) -> bool:
+        return False
+
+
+class _AsyncTapReader(_Tap):
+    def __init__(self, stream: AsyncReader, checksums: list[ChecksumSerialized[Any]]):
+        super().__init__(checksums)
+        self._stream = stream
+
+    async def read(self, n: int = -1) -> bytes:
+        return self.feed(await self._stream.read(n))
+
+    async def readexactly(self, n: int) -> bytes:
+        return self.feed(await self._stream.readexactly(n))
+
+
+def checksums(tags: Tags) -> list[ChecksumSerialized[Any]]:
+    return [t for _, t in tags if isinstance(t, ChecksumSerialized)]
+
+
+def unpack_checked(tags: Tags, stream: Reader, this: Any) -> int:
+    tap = _TapReader(stream, checksums(tags))
+    stored = list[tuple[str, ChecksumSerialized[Any], int]]()
+    for var, t in tags:
+        if isinstance(t, ChecksumSerialized):
+            tap.close(t)
+        field, _ = t._unpack(tap, this) # type: ignore
+        setattr(this, var, field)
+        if isinstance(t, ChecksumSerialized):
+            stored.append((var, t, field))
+    for var, t, field in stored:
+        t.verify(this, var, field, tap.value(t))
+    return tap.pos
+
+
+async def unpack_checked_async(tags: Tags, stream: AsyncReader, this: Any) -> int:
+    tap = _AsyncTapReader(stream, checksums(tags))
+    stored = list[tuple[str, ChecksumSerialized[Any], int]]()
+    for var, t in tags:
+        if isinstance(t, ChecksumSerialized):
+            tap.close(t)
+        field, _ = await t._unpack_async(tap, this) # type: ignore
+        setattr(this, var, field)
+        if isinstance(t, ChecksumSerialized):
+            stored.append((var, t, field))
+    for var, t, field in stored:
+        t.verify(this, var, field, tap.value(t))
+    return tap.pos
+
+
+# buffers are already in memory: checksums run over views of them, without copying
+def unpack_from_checked(tags: Tags, buffer: Buffer, offset: int, this: Any) -> int:
+    start = offset
+    stored = list[tuple[str, ChecksumSerialized[Any], int, int]]()
+    for var, t in tags:
+        field, size = t._unpack_from(buffer, offset, this)
+        setattr(this, var, field)
+        if isinstance(t, ChecksumSerialized):
+            stored.append((var, t, field, offset - start))
+        offset += size
+    for var, t, field, at in stored:
+        stop = at if t.stop is None else t.stop
+        t.verify(this, var, field, t.compute(buffer[start + t.start:start + stop]))
+    return offset - start
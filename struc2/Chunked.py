@@ -0,0 +1,218 @@
+import struct
+import sys
+from array import array
+from itertools import chain
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar, Union
+
+from .Serialized import AsyncReader, Buffer, Reader, Serialized, SerializedDecoder, SerializedFactory, skip_bytes
+from .SerializedImpl import SerializedSimple
+from .Registry import register_type
+from .Context import borrowed
+
+T = TypeVar("T")
+
+DEFAULT_CHUNK = 64 * 1024
+
+Tags = list[tuple[str, Serialized[Any]]]
+
+
+class ChunkedArray(Generic[T]):
+    # elements decoded lazily, `chunk_size` at a time. Decoded from a stream, the fields after the
+    # array are only decoded once it's exhausted or `skip`ped: finish it before reading on
+    length: int
+    chunk_size: int
+    # elements decoded or skipped so far
+    consumed: int
+
+    def __init__(
+        self,
+        ser: SerializedDecoder[T],
+        length: int,
+        chunk_size: int,
+        instance: Any,
+        source: Union[Reader, Buffer],
+        offset: int = 0,
+    ):
+        self._ser = ser
+        self.length = length
+        self.chunk_size = chunk_size
+        self.consumed = 0
+        self._instance = instance
+        self._source = source
+        self._offset = offset
+        self._item_size = ser._size()
+        # decodes the rest of the record
+        self._then: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def done(self) -> bool:
+        return self.consumed >= self.length
+
+    def __iter__(self) -> Iterator[list[T]]:
+        return self.chunks()
+
+    def chunks(self) -> Iterator[list[T]]:
+        while not self.done:
+            yield self._next(min(self.chunk_size, self.length - self.consumed))
+        self._finalize()
+
+    def elements(self) -> Iterator[T]:
+        return chain.from_iterable(self.chunks())
+
+    # chunks as `array.array`, for elements of a plain numeric type
+    def arrays(self) -> Iterator["array[Any]"]:
+        ser = self._ser
+        if not isinstance(ser, SerializedSimple) or ser.struct_type in "c?":
+            raise TypeError("Only arrays of numbers can be read as array.array")
+        swap = ser._endian.value != ("<" if sys.byteorder == "little" else ">")
+        while not self.done:
+            n = min(self.chunk_size, self.length - self.consumed)
+            chunk = array(ser.struct_type)
+            if chunk.itemsize != ser.struct_type_size:
+                raise TypeError(f"array.array `{ser.struct_type}` items aren't {ser.struct_type_size} bytes here")
+            chunk.frombytes(self._raw(n * ser.struct_type_size))
+            if swap:
+                chunk.byteswap()
+            self.consumed += n
+            yield chunk
+        self._finalize()
+
+    # moves past the elements not consumed yet without decoding them, returns their number
+    def skip(self) -> int:
+        left = self.length - self.consumed
+        if self._item_size is not None:
+            self._raw_skip(left * self._item_size)
+        elif isinstance(self._source, memoryview):
+            for _ in range(left):
+                self._offset += self._ser._skip_from(self._source, self._offset, self._instance)
+        else:
+            for _ in range(left):
+                self._ser._skip(self._source, self._instance)
+        self.consumed = self.length
+        self._finalize()
+        return left
+
+    def _next(self, n: int) -> list[T]:
+        source = self._source
+        if isinstance(source, memoryview):
+            values, size = self._ser._unpack_many(source, self._offset, n, self._instance)
+            self._offset += size
+        elif self._item_size is not None:
+            values, _ = self._ser._unpack_many(memoryview(self._raw(n * self._item_size)), 0, n, self._instance)
+        else:
+            values = [self._ser._unpack(source, self._instance)[0] for _ in range(n)]
+        self.consumed += n
+        return values
+
+    def _raw(self, size: int) -> bytes:
+        if isinstance(self._source, memoryview):
+            data = bytes(self._source[self._offset:self._offset + size])
+            self._offset += size
+            return data
+        return self._source.read(size)
+
+    def _raw_skip(self, size: int) -> None:
+        if isinstance(self._source, memoryview):
+            self._offset += size
+        else:
+            skip_bytes(self._source, size)
+
+    def _finalize(self) -> None:
+        then, self._then = self._then, None
+        if then is not None:
+            then()
+
+
+# `length` elements returned as a ChunkedArray instead of a list, e.g.
+# Tag[ChunkedArray[int], 10_000_000, 4096, "chunked[]", "u16"] for chunks of 4096
+@register_type
+class SerializedChunkedArray(SerializedFactory[ChunkedArray[T]], Generic[T]):
+    _name = "chunked[]"
+
+    _length: int
+    _chunk_size: int
+    _ser: SerializedDecoder[T]
+
+    def __init__(self, length: int, chunk_size: int = DEFAULT_CHUNK):
+        self._length = length
+        self._chunk_size = chunk_size
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[ChunkedArray[T], int]:
+        return ChunkedArray(self._ser, self._length, self._chunk_size, instance, stream), 0
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[ChunkedArray[T], int]:
+        raise NotImplementedError("chunked arrays can't be decoded from async streams")
+
+    # in a buffer the array's extent is known, or found by skipping, so the record is decoded whole.
+    # A borrowed buffer is copied from, the array keeps the bytes of its extent
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[ChunkedArray[T], int]:
+        size = self._skip_from(buffer, offset, instance)
+        if borrowed.get():
+            buffer, offset = memoryview(bytes(buffer[offset:offset + size])), 0
+        return ChunkedArray(self._ser, self._length, self._chunk_size, instance, buffer, offset), size
+
+    def _size(self) -> Optional[int]:
+        size = self._ser._size()
+        return None if size is None else size * self._length
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        size = self._size()
+        if size is not None:
+            skip_bytes(stream, size)
+            return size
+        return sum(self._ser._skip(stream, instance) for _ in range(self._length))
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        size = self._size()
+        if size is not None:
+            return size
+        start = offset
+        for _ in range(self._length):
+            offset += self._ser._skip_from(buffer, offset, instance)
+        return offset - start
+
+    def _pack(self, value: Iterable[Any], instance: Any) -> bytes:
+        values = value.elements() if isinstance(value, ChunkedArray) else value
+        packed = [self._ser._pack(v, instance) for v in values]
+        if len(packed) != self._length:
+            raise struct.error(f"chunked array must have {self._length} elements, got {len(packed)}")
+        return b"".join(packed)
+
+    def _compose(self, ser: SerializedDecoder[T]) -> None:
+        self._ser = ser
+
+
+def deferring(tags: Tags) -> bool:
+    return any(isinstance(t, SerializedChunkedArray) for _, t in tags)
+
+
+# stream decoding that stops at a chunked array, the fields after it are decoded once it's finished.
+# Returns the number of bytes read so far
+def unpack_deferred(tags: Tags, stream: Reader, this: Any) -> int:
+    size = 0
+    for i, (var, t) in enumerate(tags):
+        field, read = t._unpack(stream, this)
+        setattr(this, var, field)
+        size += read
+        if isinstance(field, ChunkedArray) and not field.done:
+            rest = tags[i + 1:]
+
+            def then() -> None:
+                unpack_deferred(rest, stream, this)
+            field._then = then
+            return size
+    return size
+
+
+# skip what the consumer left of a record's chunked arrays, which decodes the record to its end
+def finish(tags: Tags, this: Any) -> None:
+    for var, _ in tags:
+        field = getattr(this, var, None)
+        if isinstance(field, ChunkedArray) and field._then is not None:
+            field.skip()
@@ -0,0 +1,125 @@
+import struct
+from typing import Any, Mapping, Optional, Sequence, Union
+
+from .Accel import NUMERIC_CODES, NUMPY_MIN_LENGTH, numpy
+from .Serialized import Serialized
+from .SerializedImpl import SerializedArray, SerializedSimple
+from .Native import SerializedPadded
+from .Resync import SerializedMagic
+
+# records packed a column at a time: each field's column is encoded in one call, then its bytes
+# are interleaved into the records with strided slice assignments, a few per field
+
+Tags = list[tuple[str, Serialized[Any]]]
+Columns = Mapping[str, Sequence[Any]]
+
+
+# (field, offset, size) of every field of a fixed size record
+def offsets(tags: Tags) -> list[tuple[str, Serialized[Any], int, int]]:
+    out = list[tuple[str, Serialized[Any], int, int]]()
+    offset = 0
+    for var, t in tags:
+        size = t._size()
+        if size is None:
+            raise TypeError(f"Field `{var}` must have a fixed size to be packed from columns")
+        out.append((var, t, offset, size))
+        offset += size
+    return out
+
+
+# numpy dtype for a column of `ser` values, None when numpy can't encode it
+def _dtype(ser: Any) -> Optional[str]:
+    if isinstance(ser, SerializedSimple) and ser.struct_type in NUMERIC_CODES:
+        return f"{ser._endian.value}{ser.struct_type}"
+    return None
+
+
+# column as `dtype` bytes, checked like struct.pack checks values so both paths accept the same
+# columns: integers must fit, floats aren't truncated to integers. None leaves it to struct.pack
+def _numpy_bytes(np: Any, column: Any, dtype: str, shape: tuple[int, ...]) -> Optional[bytes]:
+    values = np.asarray(column)
+    if values.dtype.kind not in "biuf":
+        return None # python ints too large for numpy, mixed types: struct.pack reports them
+    if values.shape != shape:
+        raise ValueError(f"Array column must be {shape[0]} rows of {shape[-1]} elements")
+    target = np.dtype(dtype)
+    if target.kind in "iu":
+        if values.dtype.kind == "f":
+            raise struct.error("required argument is not an integer")
+        info = np.iinfo(target)
+        if values.size and (values.min() < info.min or values.max() > info.max):
+            raise struct.error(f"column values out of range for format `{target.char}`")
+    elif target.itemsize == 4 and values.dtype.kind == "f":
+        finite = values[np.isfinite(values)]
+        if finite.size and np.abs(finite).max() > np.finfo(np.float32).max:
+            raise OverflowError("float too large to pack with f format")
+    return values.astype(target).tobytes()
+
+
+# `count` values of `ser` one after another
+def column_bytes(ser: Any, column: Any, count: int) -> bytes:
+    if isinstance(ser, SerializedPadded):
+        inner = column_bytes(ser._ser, column, count)
+        return _interleave(inner, count, ser._ser._size(), ser.before, ser.before + ser._ser._size() + ser.after)
+    if isinstance(ser, SerializedMagic):
+        return ser.marker * count
+    if len(column) != count:
+        raise ValueError(f"Columns have different lengths: {len(column)} and {count}")
+    np = numpy()
+    if isinstance(ser, SerializedArray):
+        item = ser._ser
+        if isinstance(item, SerializedSimple):
+            if np is not None and (dtype := _dtype(item)) is not None and count >= NUMPY_MIN_LENGTH:
+                encoded = _numpy_bytes(np, column, dtype, (count, ser._length))
+                if encoded is not None:
+                    return encoded
+            flat = [v for row in column for v in row]
+            if len(flat) != count * ser._length:
+                raise ValueError(f"Array column must be {count} rows of {ser._length} elements")
+            return struct.pack(f"{item._endian.value}{len(flat)}{item.struct_type}", *flat)
+    if isinstance(ser, SerializedSimple):
+        if np is not None and (dtype := _dtype(ser)) is not None and count >= NUMPY_MIN_LENGTH:
+            encoded = _numpy_bytes(np, column, dtype, (count,))
+            if encoded is not None:
+                return encoded
+        return struct.pack(f"{ser._endian.value}{count}{ser.struct_type}", *column)
+    # other fixed size types are packed value by value
+    return b"".join([ser._pack(v, None) for v in column])
+
+
+# `data` of `count` items of `size` bytes placed at `offset` of every `stride` bytes of a new buffer
+def _interleave(data: bytes, count: int, size: int, offset: int, stride: int) -> bytes:
+    out = bytearray(count * stride)
+    for j in range(size):
+        out[offset + j::stride] = data[j::size]
+    return bytes(out)
+
+
+def pack_columns(tags: Tags, columns: Columns, out: Optional[Any] = None) -> Union[bytearray, Any]:
+    layout = offsets(tags)
+    stride = sum(size for _, _, _, size in layout)
+    lengths = {len(columns[var]) for var, t, _, _ in layout if var in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    count = lengths.pop() if lengths else 0
+    if out is None:
+        out = bytearray(count * stride)
+    view = memoryview(out).cast("B")
+    if len(view) < count * stride:
+        raise ValueError(f"{count} records need {count * stride} bytes, the buffer has {len(view)}")
+    for var, t, offset, size in layout:
+        if var in columns:
+            column: Any = columns[var]
+        elif isinstance(t, SerializedMagic) or (isinstance(t, SerializedPadded) and isinstance(t._ser, SerializedMagic)):
+            column = ()
+        else:
+            raise ValueError(f"No column for field `{var}`")
+        data = column_bytes(t, column, count)
+        if len(data) != count * size:
+            raise ValueError(f"Column `{var}` encodes to {len(data)} bytes instead of {count * size}")
+        if size == stride:
+            view[:len(data)] = data
+            continue
+        for j in range(size):
+            view[offset + j:count * stride:stride] = data[j::size]
+    return out
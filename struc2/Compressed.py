@@ -0,0 +1,74 @@
+from typing import Any, Iterator
+
+from .Serialized import Reader, Truncated
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+CODECS = ("gzip", "zlib", "bz2", "lzma")
+
+
+def _decompressor(codec: str) -> Any:
+    if codec == "gzip":
+        import zlib
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == "zlib":
+        import zlib
+        return zlib.decompressobj()
+    if codec == "bz2":
+        import bz2
+        return bz2.BZ2Decompressor()
+    if codec == "lzma":
+        import lzma
+        return lzma.LZMADecompressor()
+    raise ValueError(f"Unknown codec `{codec}`, expected one of {CODECS}")
+
+
+def _cut(codec: str) -> Truncated:
+    return Truncated(f"{codec} stream ended before its end-of-stream marker")
+
+
+# decompressed blocks of at most `block_size` bytes, concatenated streams (multi-member gzip) included.
+# A stream ending inside a compressed one raises Truncated
+def decompressed(stream: Reader, codec: str, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[bytes]:
+    d = _decompressor(codec)
+    data = b""
+    started = False
+    if codec in ("gzip", "zlib"):
+        while True:
+            if not data:
+                data = stream.read(block_size)
+                if not data:
+                    if tail := d.flush():
+                        yield tail
+                    if started:
+                        raise _cut(codec)
+                    return
+            started = True
+            out = d.decompress(data, block_size)
+            data = d.unconsumed_tail
+            if d.eof:
+                data = d.unused_data + data
+                d = _decompressor(codec)
+                started = False
+            if out:
+                yield out
+    else:
+        while True:
+            if d.needs_input:
+                if not data:
+                    data = stream.read(block_size)
+                    if not data:
+                        if started:
+                            raise _cut(codec)
+                        return
+                started = True
+                out = d.decompress(data, block_size)
+                data = b""
+            else:
+                out = d.decompress(b"", block_size)
+            if d.eof:
+                data = d.unused_data
+                d = _decompressor(codec)
+                started = False
+            if out:
+                yield out
@@ -0,0 +1,86 @@
+import operator
+from typing import Any, Callable, Optional, Union
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory
+from .Dynamic import serialized_dynamic
+
+_OPS: dict[str, Callable[[Any, Any], Any]] = {
+    "&": operator.and_,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, values: value in values,
+}
+
+
+class ConditionalSerialized(SerializedFactory[Any]):
+    # params: an earlier field (dotted for nested structs), optionally an operator, and an operand.
+    # A bare mask tests bits: ("flags", 0x04) is present when flags & 0x04. When the condition
+    # doesn't hold the field is None and takes no bytes
+    field: str
+    op: str
+    operand: Any
+    _ser: SerializedDecoder[Any]
+
+    def __init__(self, params: Union[tuple[str, Any], tuple[str, str, Any]]):
+        if len(params) == 2:
+            self.field, self.operand = params
+            self.op = "&"
+        else:
+            self.field, self.op, self.operand = params
+        if self.op not in _OPS:
+            raise ValueError(f"Unknown condition operator `{self.op}`")
+        self._get = operator.attrgetter(self.field)
+        self._test = _OPS[self.op]
+
+    def _present(self, instance: Any) -> bool:
+        return bool(self._test(self._get(instance), self.operand))
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        if not self._present(instance):
+            return None, 0
+        return self._ser._unpack(stream, instance)
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        if not self._present(instance):
+            return None, 0
+        return await self._ser._unpack_async(stream, instance)
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        if not self._present(instance):
+            return None, 0
+        return self._ser._unpack_from(buffer, offset, instance)
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        deps = self._ser._depends()
+        return None if deps is None else deps | {self.field.split(".")[0]}
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance) if self._present(instance) else 0
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance) if self._present(instance) else 0
+
+    def _refill(self, stream: Reader, instance: Any, out: Any) -> tuple[Any, int]:
+        if not self._present(instance):
+            return None, 0
+        return self._ser._refill(stream, instance, out)
+
+    def _refill_from(self, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[Any, int]:
+        if not self._present(instance):
+            return None, 0
+        return self._ser._refill_from(buffer, offset, instance, out)
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return self._ser._pack(value, instance) if self._present(instance) else b""
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._ser = ser
+
+
+# field decoded only when an earlier one says so, without a callback:
+# Tag[Optional[int], If["flags", 0x04], "u32"], Tag[Optional[int], If["version", ">=", 2], "u16"]
+If = serialized_dynamic(ConditionalSerialized)
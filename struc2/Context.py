@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar, cast
+
+if TYPE_CHECKING:
+    from .Limits import Limits
+
+# per call decode options, set by the public entry points for the duration of a decode
+
+# byte fields decoded from a buffer are returned as memoryview slices of it instead of copies
+zero_copy: ContextVar[bool] = ContextVar("struc2_zero_copy", default=False)
+
+# the buffer is reused once the decode returns: decoded values can't keep views of it
+borrowed: ContextVar[bool] = ContextVar("struc2_borrowed", default=False)
+
+# bounds on decode cost, see `Limits`, and how deep in nested structs the decode is
+limits: ContextVar[Optional["Limits"]] = ContextVar("struc2_limits", default=None)
+depth: ContextVar[int] = ContextVar("struc2_depth", default=0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def with_option(var: ContextVar[Any], value: Any, f: F) -> F:
+    # the option only holds while `f` runs, so it never leaks to code between two decodes
+    def call(*args: Any) -> Any:
+        token = var.set(value)
+        try:
+            return f(*args)
+        finally:
+            var.reset(token)
+    return cast(F, call)
@@ -1,5 +1,7 @@
+import dis
+import sys
 from typing import Any, Callable, Generic, Optional, TypeVar, Union, cast, get_origin
-from types import GenericAlias
+from types import CodeType, FunctionType, GenericAlias
 from .Serialized import (
     RetT,
     SerializedCompositor,
@@ -7,14 +9,84 @@ from .Serialized import (
     SerializedFactory,
     Reader,
     AsyncReader,
+    Buffer,
     Serialized,
 )
-import inspect
 from .TagParser import TagType
 
 T = TypeVar("T")
 
 
+def _loads_method(instruction: dis.Instruction) -> bool:
+    if instruction.opname == "LOAD_METHOD":
+        return True
+    # python 3.12 folded LOAD_METHOD into LOAD_ATTR, flagged by the low bit
+    return sys.version_info >= (3, 12) and instruction.opname == "LOAD_ATTR" and bool(instruction.arg & 1)
+
+
+# `self.count()`: methods of the instance read fields the names don't show, and so do `vars(self)`
+# and `getattr(self, name)` with a computed name
+def _reads_hidden_names(code: CodeType) -> bool:
+    params = set(code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]).union(code.co_freevars)
+    instructions = list(dis.get_instructions(code))
+    for i, instruction in enumerate(instructions):
+        if instruction.opname == "LOAD_GLOBAL" and instruction.argval in ("vars", "getattr", "hasattr"):
+            name = instructions[i + 2] if i + 2 < len(instructions) else None
+            if instruction.argval == "vars" or name is None or name.opname != "LOAD_CONST" or not isinstance(name.argval, str):
+                return True
+        previous = instructions[i - 1] if i else None
+        if previous is not None and previous.argval in params and _loads_method(instruction):
+            if previous.opname.startswith("LOAD_FAST") or previous.opname == "LOAD_DEREF":
+                return True
+    return False
+
+
+# what a callback reaches through a global or closure: functions are followed, field types and
+# structs it resolves to are fine, other callables (partials, attrgetters, bound methods, objects
+# with __call__, builtins) can't be followed and make it unknown
+def _reached(value: Any, funcs: list[FunctionType]) -> bool:
+    if isinstance(value, FunctionType):
+        funcs.append(value)
+    elif callable(value):
+        return isinstance(value, type) and hasattr(value, "_unpack_from")
+    return True
+
+
+# names a callback may read from the instance: attribute names and string constants used by its code
+# and by functions it reaches through globals or closures. None when there is no code to inspect,
+# it reaches other callables or reads names of its arguments it doesn't spell out
+def callback_names(f: Any) -> Optional[frozenset[str]]:
+    f = getattr(f, "__func__", f)
+    if not isinstance(f, FunctionType):
+        return None
+    names = set[str]()
+    seen = set[CodeType]()
+    funcs = [f]
+    while funcs:
+        func = funcs.pop()
+        codes = [func.__code__]
+        while codes:
+            code = codes.pop()
+            if code in seen:
+                continue
+            seen.add(code)
+            if _reads_hidden_names(code):
+                return None
+            names.update(code.co_names)
+            for const in code.co_consts:
+                if isinstance(const, str):
+                    names.add(const)
+                elif isinstance(const, CodeType):
+                    codes.append(const)
+            for name in code.co_names:
+                if not _reached(func.__globals__.get(name), funcs):
+                    return None
+        for cell in func.__closure__ or ():
+            if not _reached(cell.cell_contents, funcs):
+                return None
+    return frozenset(names)
+
+
 def serialized_dynamic(cls_: type):
     class DynamicSerialized:
         @classmethod
@@ -48,6 +120,23 @@ class DynamicValue(SerializedFactory[OutT], Generic[RetT, OutT]):
         res, read = await self._ser._unpack_async(stream, instance)
         return self._f(res), read
 
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[OutT, int]:
+        res, read = self._ser._unpack_from(buffer, offset, instance)
+        return self._f(res), read
+
+    # the function gets only the decoded value, so skipping never has to call it
+    def _size(self) -> Optional[int]:
+        return self._ser._size()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance)
+
     def _compose(self, ser: SerializedDecoder[RetT]) -> None:
         self._ser = ser
 
@@ -89,24 +178,69 @@ class DynamicTypeResolution(SerializedFactory[Any], Generic[InstT, SerF_RetT, Re
     def _get_serialized(self, instance: InstT) -> Optional[Serialized[Any]]:
         r = self._f(instance)
         if type(r) is list:
-            return TagType.parse_tags(tuple(cast(list[Any], self._f(instance)))).ser
+            return TagType.parse_tags(tuple(cast(list[Any], r))).ser
         return cast(Optional[Serialized[Any]], r)
 
-    def _unpack(self, stream: Reader, instance: InstT) -> tuple[Any, int]:
+    def _resolve(self, instance: InstT) -> Optional[Serialized[Any]]:
         ser = self._get_serialized(instance)
+        if ser is not None and self._composition_ser is not None:
+            ser._compose(self._composition_ser)
+        return ser
+
+    def _unpack(self, stream: Reader, instance: InstT) -> tuple[Any, int]:
+        ser = self._resolve(instance)
         if ser is None:
             return None, 0
-        if self._composition_ser is not None:
-            ser._compose(self._composition_ser)
         return ser._unpack(stream, instance)
 
     async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
-        ser = self._get_serialized(instance)
+        ser = self._resolve(instance)
         if ser is None:
             return None, 0
-        if self._composition_ser is not None:
-            ser._compose(self._composition_ser)
         return await ser._unpack_async(stream, instance)
 
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: InstT) -> tuple[Any, int]:
+        ser = self._resolve(instance)
+        if ser is None:
+            return None, 0
+        return ser._unpack_from(buffer, offset, instance)
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        names = callback_names(self._f)
+        if names is None or self._composition_ser is None:
+            return names
+        deps = self._composition_ser._depends()
+        return None if deps is None else names | deps
+
+    def _skip(self, stream: Reader, instance: InstT) -> int:
+        ser = self._resolve(instance)
+        if ser is None:
+            return 0
+        return ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: InstT) -> int:
+        ser = self._resolve(instance)
+        if ser is None:
+            return 0
+        return ser._skip_from(buffer, offset, instance)
+
+    def _refill(self, stream: Reader, instance: InstT, out: Any) -> tuple[Any, int]:
+        ser = self._resolve(instance)
+        if ser is None:
+            return None, 0
+        return ser._refill(stream, instance, out)
+
+    def _refill_from(self, buffer: Buffer, offset: int, instance: InstT, out: Any) -> tuple[Any, int]:
+        ser = self._resolve(instance)
+        if ser is None:
+            return None, 0
+        return ser._refill_from(buffer, offset, instance, out)
+
+    def _pack(self, value: Any, instance: InstT) -> bytes:
+        ser = self._resolve(instance)
+        if ser is None:
+            return b""
+        return ser._pack(value, instance)
+
     def _compose(self, ser: SerializedDecoder[RetT]) -> None:
         self._composition_ser = ser
@@ -0,0 +1,143 @@
+import struct
+from itertools import accumulate, chain, groupby, repeat
+from typing import Any, Iterable, Optional, cast
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory, Truncated, skip_bytes
+from .SerializedImpl import SerializedSimple
+from .Registry import register_type
+from . import Accel
+from .Limits import check
+
+
+class SerializedEncodedArray(SerializedFactory[list[Any]]):
+    # `length` stored elements of the composed type, expanded to the values they encode
+    _length: int
+    _ser: SerializedDecoder[Any]
+    # numpy dtype of the elements when they are plain numbers
+    _dtype: Optional[str] = None
+
+    def __init__(self, length: int):
+        self._length = length
+
+    def _stored(self) -> int:
+        return self._length
+
+    def _expand(self, values: Iterable[Any]) -> list[Any]:
+        raise NotImplementedError
+
+    def _expand_numpy(self, np: Any, values: Any) -> list[Any]:
+        raise NotImplementedError
+
+    def _encode(self, value: list[Any]) -> list[Any]:
+        raise NotImplementedError
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[list[Any], int]:
+        check("max_array", self._stored())
+        size = self._size()
+        if size is not None:
+            return self._unpack_from(memoryview(stream.read(size)), 0, instance)
+        values = list[Any]()
+        size = 0
+        for _ in range(self._stored()):
+            res, read = self._ser._unpack(stream, instance)
+            values.append(res)
+            size += read
+        return self._expand(values), size
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[list[Any], int]:
+        check("max_array", self._stored())
+        values = list[Any]()
+        size = 0
+        for _ in range(self._stored()):
+            res, read = await self._ser._unpack_async(stream, instance)
+            values.append(res)
+            size += read
+        return self._expand(values), size
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[list[Any], int]:
+        count = self._stored()
+        check("max_array", count)
+        if self._dtype is not None and count >= Accel.NUMPY_MIN_LENGTH and (np := Accel.numpy()) is not None:
+            size = count * cast(int, self._ser._size())
+            if offset + size > len(buffer):
+                raise Truncated(f"unpack requires a buffer of {size} bytes")
+            return self._expand_numpy(np, np.frombuffer(buffer, self._dtype, count, offset)), size
+        values, size = self._ser._unpack_many(buffer, offset, count, instance)
+        return self._expand(values), size
+
+    def _size(self) -> Optional[int]:
+        size = self._ser._size()
+        return None if size is None else size * self._stored()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        size = self._size()
+        if size is not None:
+            skip_bytes(stream, size)
+            return size
+        return sum(self._ser._skip(stream, instance) for _ in range(self._stored()))
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        start = offset
+        for _ in range(self._stored()):
+            offset += self._ser._skip_from(buffer, offset, instance)
+        return offset - start
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        stored = self._encode(list(value))
+        if len(stored) != self._stored():
+            raise struct.error(f"{type(self)._name} encodes to {len(stored)} elements, expected {self._stored()}") # type: ignore
+        return b"".join([self._ser._pack(v, instance) for v in stored])
+
+    # sums of 64 bit integers (deltas, run lengths) can outgrow int64: those are left to python ints
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._ser = ser
+        if isinstance(ser, SerializedSimple) and ser.struct_type in Accel.NUMERIC_CODES and ser.struct_type not in "qQ":
+            self._dtype = f"{ser._endian.value}{ser.struct_type}"
+
+
+# first element is the first value, each next one the difference from the previous value
+@register_type
+class SerializedDeltaArray(SerializedEncodedArray):
+    _name = "delta[]"
+
+    def _expand(self, values: Iterable[Any]) -> list[Any]:
+        return list(accumulate(values))
+
+    def _expand_numpy(self, np: Any, values: Any) -> list[Any]:
+        # accumulated in 64 bits (or floats), narrow element types would wrap around
+        wide = np.float64 if values.dtype.kind == "f" else np.int64
+        return np.cumsum(values, dtype=wide).tolist()
+
+    def _encode(self, value: list[Any]) -> list[Any]:
+        return [b - a for a, b in zip([0] + value, value)]
+
+
+# `length` (count, value) pairs, each value repeated count times
+@register_type
+class SerializedRunLengthArray(SerializedEncodedArray):
+    _name = "rle[]"
+
+    def _stored(self) -> int:
+        return self._length * 2
+
+    # the expanded length is checked before the runs are expanded
+    def _expand(self, values: Iterable[Any]) -> list[Any]:
+        values = list(values)
+        counts = values[0::2]
+        if counts and min(counts) < 0:
+            raise struct.error(f"negative run length {min(counts)}")
+        check("max_array", sum(counts))
+        return list(chain.from_iterable(repeat(v, c) for c, v in zip(counts, values[1::2])))
+
+    def _expand_numpy(self, np: Any, values: Any) -> list[Any]:
+        counts = values[0::2]
+        if counts.size and counts.min() < 0:
+            raise struct.error(f"negative run length {counts.min()}")
+        check("max_array", int(counts.sum(dtype=np.int64)))
+        return np.repeat(values[1::2], counts).tolist()
+
+    def _encode(self, value: list[Any]) -> list[Any]:
+        return list(chain.from_iterable((len(list(run)), v) for v, run in groupby(value)))
@@ -0,0 +1,140 @@
+import struct
+from typing import Any, Generic, Optional, TypeVar, Union
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory, Truncated, skip_bytes
+from .Registry import register_type
+from .Dynamic import serialized_dynamic
+from .Limits import LimitExceeded, bound, check
+
+T = TypeVar("T")
+
+
+# elements up to the end of what's being decoded: the enclosing Frame, the buffer or the stream.
+# Fixed size elements are decoded with a single `_unpack_many` call, e.g. Tag[list[int], "rest[]", "u16"]
+@register_type
+class SerializedRestArray(SerializedFactory[list[T]], Generic[T]):
+    _name = "rest[]"
+
+    _ser: SerializedDecoder[T]
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[list[T], int]:
+        data = stream.read()
+        return self._unpack_from(memoryview(data), 0, instance)
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[list[T], int]:
+        data = await stream.read()
+        return self._unpack_from(memoryview(data), 0, instance)
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[list[T], int]:
+        left = len(buffer) - offset
+        size = self._ser._size()
+        if size is not None:
+            if size == 0 or left % size:
+                raise struct.error(f"{left} bytes left aren't a whole number of {size} byte elements")
+            check("max_array", left // size)
+            return self._ser._unpack_many(buffer, offset, left // size, instance)
+        r = list[T]()
+        limit = bound("max_array")
+        end = offset + left
+        while offset < end:
+            if limit is not None and len(r) >= limit:
+                raise LimitExceeded("max_array", len(r) + 1, limit)
+            value, read = self._ser._unpack_from(buffer, offset, instance)
+            r.append(value)
+            offset += read
+        if offset > end:
+            raise struct.error("last element runs past the end")
+        return r, left
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return len(stream.read())
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return len(buffer) - offset
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return b"".join([self._ser._pack(v, instance) for v in value])
+
+    def _compose(self, ser: SerializedDecoder[T]) -> None:
+        self._ser = ser
+
+
+class FrameSerialized(SerializedFactory[Any]):
+    # the composed type decoded from the next `length` bytes only, `length` is a number or the name
+    # of an earlier field: Tag[Body, Frame["body_size"], Body] where Body ends with a "rest[]" array.
+    # The frame is always consumed whole, whatever the composed type reads of it
+    length: Union[int, str]
+    _ser: SerializedDecoder[Any]
+
+    def __init__(self, length: Union[int, str]):
+        self.length = length
+
+    def _length(self, instance: Any) -> int:
+        length = self.length
+        n = getattr(instance, length) if isinstance(length, str) else length
+        check("max_record", n)
+        return n
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        n = self._length(instance)
+        data = stream.read(n)
+        if len(data) < n:
+            raise Truncated(f"frame of {n} bytes cut at {len(data)}")
+        return self._ser._unpack_from(memoryview(data), 0, instance)[0], n
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        n = self._length(instance)
+        return self._ser._unpack_from(memoryview(await stream.readexactly(n)), 0, instance)[0], n
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        n = self._length(instance)
+        if offset + n > len(buffer):
+            raise Truncated(f"frame of {n} bytes runs past the end")
+        return self._ser._unpack_from(buffer[offset:offset + n], 0, instance)[0], n
+
+    def _size(self) -> Optional[int]:
+        return self.length if isinstance(self.length, int) else None
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        deps = self._ser._depends()
+        if deps is None or isinstance(self.length, int):
+            return deps
+        return deps | {self.length}
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        n = self._length(instance)
+        skip_bytes(stream, n)
+        return n
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._length(instance)
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        packed = self._ser._pack(value, instance)
+        n = self._length(instance)
+        if len(packed) != n:
+            raise struct.error(f"frame must be {n} bytes, got {len(packed)}")
+        return packed
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._ser = ser
+
+
+Frame = serialized_dynamic(FrameSerialized)
+
+
+# a "rest[]" outside any Frame: the record runs to the end of what it's decoded from
+def reads_to_end(tags: list[tuple[str, Any]]) -> bool:
+    for _, t in tags:
+        while t is not None and not isinstance(t, FrameSerialized):
+            if isinstance(t, SerializedRestArray):
+                return True
+            if hasattr(t, "_get_tags"):
+                if reads_to_end(t._get_tags()):
+                    return True
+                break
+            t = getattr(t, "_ser", None)
+    return False
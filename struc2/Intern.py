@@ -0,0 +1,111 @@
+from typing import Any, Optional, Union
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory
+from .Dynamic import serialized_dynamic
+
+DEFAULT_INTERN_SIZE = 64 * 1024
+
+
+class InternTable:
+    # one shared object per distinct decoded value; once `maxsize` values are held new ones are
+    # returned as decoded without being added, so the table never grows past it
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = DEFAULT_INTERN_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        # raw bytes to the shared value, per encoding (None keeps bytes)
+        self._values = dict[Optional[str], dict[bytes, Any]]()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _for(self, encoding: Optional[str]) -> dict[bytes, Any]:
+        return self._values.setdefault(encoding, {})
+
+    def _add(self, values: dict[bytes, Any], raw: bytes, encoding: Optional[str]) -> Any:
+        self.misses += 1
+        value = raw if encoding is None else raw.decode(encoding)
+        if self._size < self.maxsize:
+            values[raw] = value
+            self._size += 1
+        return value
+
+    def clear(self) -> None:
+        for values in self._values.values():
+            values.clear()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+# table used by Intern fields that don't name one
+GLOBAL_TABLE = InternTable()
+
+
+# bytes fields, cstrings and fixed size ones, decoded to shared objects: Intern[None] interns bytes
+# in the global table, Intern["utf-8"] decodes to str, Intern[table] or Intern[table, "utf-8"] use
+# a table of their own, e.g. one per schema
+@serialized_dynamic
+class Intern(SerializedFactory[Any]):
+    table: InternTable
+    encoding: Optional[str]
+    _ser: SerializedDecoder[Any]
+
+    def __init__(self, params: Union[None, str, InternTable, tuple[InternTable, str]]):
+        table, encoding = params if isinstance(params, tuple) else (params, None)
+        if isinstance(table, str):
+            table, encoding = None, table
+        self.table = GLOBAL_TABLE if table is None else table
+        self.encoding = encoding
+        self._values = self.table._for(encoding)
+
+    def _intern(self, raw: Any) -> Any:
+        if type(raw) is not bytes:
+            raw = bytes(raw)
+        value = self._values.get(raw)
+        if value is None:
+            return self.table._add(self._values, raw, self.encoding)
+        self.table.hits += 1
+        return value
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        raw, read = self._ser._unpack(stream, instance)
+        return self._intern(raw), read
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        raw, read = await self._ser._unpack_async(stream, instance)
+        return self._intern(raw), read
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        raw, read = self._ser._unpack_from(buffer, offset, instance)
+        return self._intern(raw), read
+
+    def _size(self) -> Optional[int]:
+        return self._ser._size()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance)
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        if isinstance(value, str):
+            value = value.encode(self.encoding or "utf-8")
+        return self._ser._pack(value, instance)
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._ser = ser
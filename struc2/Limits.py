@@ -0,0 +1,181 @@
+import struct
+from io import SEEK_CUR, SEEK_SET
+from typing import Any, Callable, Optional, TypeVar, cast
+
+from .Serialized import truncated
+from .Context import limits as limits_var, depth as depth_var
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class LimitExceeded(ValueError):
+    def __init__(self, limit: str, value: int, bound: int):
+        super().__init__(f"{limit} exceeded: {value} > {bound}")
+        self.limit = limit
+        self.value = value
+        self.bound = bound
+
+
+class Limits:
+    # bounds on what decoding one record may cost, None for no bound: elements of an array,
+    # bytes of a string, bytes of the whole record and structs nested in it. Counts and lengths are
+    # checked as soon as they're known, before anything is allocated for them
+    max_array: Optional[int]
+    max_string: Optional[int]
+    max_record: Optional[int]
+    max_depth: Optional[int]
+
+    def __init__(
+        self,
+        max_array: Optional[int] = None,
+        max_string: Optional[int] = None,
+        max_record: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ):
+        self.max_array = max_array
+        self.max_string = max_string
+        self.max_record = max_record
+        self.max_depth = max_depth
+
+    def __repr__(self) -> str:
+        return (
+            f"Limits(max_array={self.max_array}, max_string={self.max_string}, "
+            f"max_record={self.max_record}, max_depth={self.max_depth})"
+        )
+
+
+# bound of the current decode, checks cost a context variable read when no limits are set
+def bound(limit: str) -> Optional[int]:
+    limits = limits_var.get()
+    return None if limits is None else getattr(limits, limit)
+
+
+def check(limit: str, value: int) -> None:
+    limits = limits_var.get()
+    if limits is not None and (b := getattr(limits, limit)) is not None and value > b:
+        raise LimitExceeded(limit, value, b)
+
+
+# decode of a struct nested `depth` levels in the record
+def nested(limits: Any, f: Callable[..., Any], *args: Any) -> Any:
+    d = depth_var.get() + 1
+    if limits.max_depth is not None and d > limits.max_depth:
+        raise LimitExceeded("max_depth", d, limits.max_depth)
+    token = depth_var.set(d)
+    try:
+        return f(*args)
+    finally:
+        depth_var.reset(token)
+
+
+async def nested_async(limits: Any, f: Callable[..., Any], *args: Any) -> Any:
+    d = depth_var.get() + 1
+    if limits.max_depth is not None and d > limits.max_depth:
+        raise LimitExceeded("max_depth", d, limits.max_depth)
+    token = depth_var.set(d)
+    try:
+        return await f(*args)
+    finally:
+        depth_var.reset(token)
+
+
+class _BoundedReader:
+    # stream reads counted against max_record: a read that would take the record past it fails
+    # before anything is read
+    def __init__(self, stream: Any, max_record: int):
+        self._stream = stream
+        self.left = max_record
+        self.max_record = max_record
+        if (peek := getattr(stream, "peek", None)) is not None:
+            self.peek = peek
+
+    def _take(self, n: Optional[int]) -> int:
+        if n is None or n < 0:
+            return self.left + 1 # all of it: one byte more than allowed tells if there is more
+        if n > self.left:
+            raise LimitExceeded("max_record", self.max_record - self.left + n, self.max_record)
+        return n
+
+    def _count(self, data: bytes) -> bytes:
+        self.left -= len(data)
+        if self.left < 0:
+            raise LimitExceeded("max_record", self.max_record - self.left, self.max_record)
+        return data
+
+    def read(self, n: Optional[int] = -1) -> bytes:
+        return self._count(self._stream.read(self._take(n)))
+
+    def seekable(self) -> bool:
+        return self._stream.seekable()
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_CUR:
+            self.left -= self._take(offset)
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+
+class _AsyncBoundedReader(_BoundedReader):
+    async def read(self, n: Optional[int] = -1) -> bytes: # type: ignore
+        return self._count(await self._stream.read(self._take(n)))
+
+    async def readexactly(self, n: int) -> bytes:
+        return self._count(await self._stream.readexactly(self._take(n)))
+
+
+def _bounded(decode: Callable[..., Any], max_record: int, source: Any, *args: Any) -> Any:
+    if not isinstance(source, memoryview):
+        return decode(_BoundedReader(source, max_record), *args)
+    # buffers are cut one byte past the bound: reading past the cut, or up to it, is a longer record
+    end = args[0] + max_record + 1
+    if len(source) <= end:
+        return decode(source, *args)
+    try:
+        return decode(source[:end], *args)
+    except struct.error as e:
+        if truncated(e):
+            raise LimitExceeded("max_record", max_record + 1, max_record) from e
+        raise
+
+
+def _check_record(result: Any, max_record: Optional[int]) -> Any:
+    if max_record is not None and result[1] > max_record:
+        raise LimitExceeded("max_record", result[1], max_record)
+    return result
+
+
+# `decode` of a stream or a (buffer, offset), returning (record, size, ...), run under `limits`.
+# With max_record no more than that many bytes are read for the record
+def limited(limits: Optional[Limits], decode: F) -> F:
+    if limits is None:
+        return decode
+    max_record = limits.max_record
+
+    def call(*args: Any) -> Any:
+        token = limits_var.set(limits)
+        try:
+            result = decode(*args) if max_record is None else _bounded(decode, max_record, *args)
+        finally:
+            limits_var.reset(token)
+        return _check_record(result, max_record)
+    return cast(F, call)
+
+
+# the same for a coroutine function decoding a stream
+def limited_async(limits: Optional[Limits], decode: F) -> F:
+    if limits is None:
+        return decode
+    max_record = limits.max_record
+
+    async def call(stream: Any, *args: Any) -> Any:
+        if max_record is not None:
+            stream = _AsyncBoundedReader(stream, max_record)
+        token = limits_var.set(limits)
+        try:
+            result = await decode(stream, *args)
+        finally:
+            limits_var.reset(token)
+        return _check_record(result, max_record)
+    return cast(F, call)
@@ -0,0 +1,157 @@
+from typing import Any, Optional
+
+from .defs import Endian
+from .Serialized import AsyncReader, Buffer, Reader, Serialized, SerializedDecoder, SerializedFactory, skip_bytes
+from .SerializedImpl import SerializedArray, SerializedBits, SerializedBytes, SerializedSimple, SerializedString
+from .Resync import SerializedMagic
+
+# ctypes is only imported once a layout is built
+
+Tags = list[tuple[str, Serialized[Any]]]
+
+_CTYPES = {
+    "c": "c_char",
+    "b": "c_int8",
+    "B": "c_uint8",
+    "h": "c_int16",
+    "H": "c_uint16",
+    "i": "c_int32",
+    "I": "c_uint32",
+    "q": "c_int64",
+    "Q": "c_uint64",
+    "f": "c_float",
+    "d": "c_double",
+}
+
+
+# field with padding bytes around it, inserted by the native layout
+class SerializedPadded(SerializedFactory[Any]):
+    _ser: SerializedDecoder[Any]
+    before: int
+    after: int
+
+    def __init__(self, ser: SerializedDecoder[Any], before: int, after: int = 0):
+        self._ser = ser
+        self.before = before
+        self.after = after
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        skip_bytes(stream, self.before)
+        value, size = self._ser._unpack(stream, instance)
+        skip_bytes(stream, self.after)
+        return value, self.before + size + self.after
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        await stream.read(self.before)
+        value, size = await self._ser._unpack_async(stream, instance)
+        await stream.read(self.after)
+        return value, self.before + size + self.after
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        value, size = self._ser._unpack_from(buffer, offset + self.before, instance)
+        return value, self.before + size + self.after
+
+    def _size(self) -> Optional[int]:
+        size = self._ser._size()
+        return None if size is None else self.before + size + self.after
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        skip_bytes(stream, self.before)
+        size = self._ser._skip(stream, instance)
+        skip_bytes(stream, self.after)
+        return self.before + size + self.after
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self.before + self._ser._skip_from(buffer, offset + self.before, instance) + self.after
+
+    def _refill(self, stream: Reader, instance: Any, out: Any) -> tuple[Any, int]:
+        skip_bytes(stream, self.before)
+        value, size = self._ser._refill(stream, instance, out)
+        skip_bytes(stream, self.after)
+        return value, self.before + size + self.after
+
+    def _refill_from(self, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[Any, int]:
+        value, size = self._ser._refill_from(buffer, offset + self.before, instance, out)
+        return value, self.before + size + self.after
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return bytes(self.before) + self._ser._pack(value, instance) + bytes(self.after)
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        pass
+
+
+def _unpadded(ser: Any) -> Any:
+    return ser._ser if isinstance(ser, SerializedPadded) else ser
+
+
+# ctypes type of a fixed size field, nested structs map to their own `as_ctypes()`
+def ctype(ser: Any) -> Any:
+    import ctypes
+    ser = _unpadded(ser)
+    if isinstance(ser, SerializedSimple):
+        return getattr(ctypes, _CTYPES[ser.struct_type])
+    if isinstance(ser, SerializedBits):
+        return ctype(ser._ser)
+    if isinstance(ser, SerializedArray):
+        return ctype(ser._ser) * ser._length
+    if isinstance(ser, SerializedString) and ser._length is not None:
+        return ctypes.c_char * ser._length
+    if isinstance(ser, SerializedBytes):
+        return ctypes.c_char * ser._length
+    if isinstance(ser, SerializedMagic):
+        return ctypes.c_char * len(ser.marker)
+    if (as_ctypes := getattr(ser, "as_ctypes", None)) is not None:
+        return as_ctypes()
+    raise TypeError(f"`{type(ser).__name__}` has no fixed size C layout")
+
+
+def _endians(ser: Any) -> set[Endian]:
+    ser = _unpadded(ser)
+    if isinstance(ser, SerializedSimple):
+        return {ser._endian} if ser.struct_type_size > 1 else set()
+    if isinstance(ser, (SerializedBits, SerializedArray)):
+        return _endians(ser._ser)
+    return set()
+
+
+# C compiler layout: every field aligned to its ctypes alignment, the end to the largest of them
+def aligned(tags: Tags) -> Tags:
+    import ctypes
+    out = Tags()
+    offset, largest = 0, 1
+    for var, t in tags:
+        size = t._size()
+        if size is None:
+            raise ValueError(f"Field `{var}` of a native layout must have a fixed size")
+        align = ctypes.alignment(ctype(t))
+        largest = max(largest, align)
+        pad = -offset % align
+        out.append((var, SerializedPadded(t, pad) if pad else t))
+        offset += pad + size
+    if out and (tail := -offset % largest):
+        var, t = out[-1]
+        out[-1] = (var, SerializedPadded(_unpadded(t), getattr(t, "before", 0), tail))
+    return out
+
+
+def structure(name: str, tags: Tags, native: bool, size: Optional[int]) -> Any:
+    import ctypes
+    endians = set[Endian]().union(*[_endians(t) for _, t in tags])
+    if len(endians) > 1:
+        raise TypeError(f"`{name}` mixes byte orders, a ctypes structure has one")
+    base: Any = {
+        Endian.Little: ctypes.LittleEndianStructure, Endian.Big: ctypes.BigEndianStructure
+    }[endians.pop()] if endians else ctypes.Structure
+    attrs: dict[str, Any] = {}
+    if not native:
+        attrs["_pack_"] = 1
+        attrs["_layout_"] = "ms" # newer pythons want the layout spelled out with `_pack_`
+    attrs["_fields_"] = [(var, ctype(t)) for var, t in tags]
+    c_struct = type(name, (base,), attrs)
+    if ctypes.sizeof(c_struct) != size:
+        raise TypeError(f"ctypes layout of `{name}` takes {ctypes.sizeof(c_struct)} bytes instead of {size}")
+    return c_struct
@@ -0,0 +1,94 @@
+from typing import Any, Callable, Optional
+
+from .Serialized import Buffer, Reader, Serialized, skip_bytes
+
+DECODE, SKIP, SKIP_DYNAMIC, CHECK = range(4)
+
+# (kind, field name, serialized, size of SKIP step)
+Step = tuple[int, Optional[str], Optional[Serialized[Any]], int]
+
+Where = Callable[[Any], bool]
+
+
+class Projection:
+    # decode plan for a subset of fields: the rest is skipped by offset arithmetic/seek when
+    # its size is fixed, or walked with `_skip` otherwise. Fields the skipped/decoded ones read
+    # from the instance (DTR, predicate_array) are decoded too.
+    # With `check` (fields a `where` predicate reads) the predicate runs right after they are
+    # decoded, a rejected record is finished with the precompiled `reject` plan
+    steps: list[Step]
+    fields: frozenset[str]
+    reject: Optional["Projection"] = None
+
+    def __init__(
+        self,
+        tags: list[tuple[str, Serialized[Any]]],
+        fields: frozenset[str],
+        check: Optional[frozenset[str]] = None,
+    ):
+        names = [var for var, _ in tags]
+        unknown = fields.difference(names)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}")
+
+        needed = set(fields)
+        if check is not None:
+            needed.update(check)
+        steps = list[Step]()
+        for i in reversed(range(len(tags))):
+            var, ser = tags[i]
+            if var in needed:
+                steps.append((DECODE, var, ser, 0))
+                deps = ser._depends()
+            elif (size := ser._size()) is not None:
+                steps.append((SKIP, var, ser, size))
+                deps = frozenset[str]()
+            else:
+                steps.append((SKIP_DYNAMIC, var, ser, 0))
+                deps = ser._depends()
+            needed.update(names[:i] if deps is None else deps)
+        steps.reverse()
+
+        if check is not None:
+            at = max((i + 1 for i, var in enumerate(names) if var in check), default=0)
+            steps.insert(at, (CHECK, None, None, 0))
+            self.reject = Projection(tags[at:], frozenset())
+
+        self.fields = frozenset(needed.intersection(names))
+        self.steps = []
+        for step in steps:
+            prev = self.steps[-1] if self.steps else None
+            if step[0] == SKIP and prev is not None and prev[0] == SKIP:
+                self.steps[-1] = (SKIP, None, None, prev[3] + step[3])
+            else:
+                self.steps.append(step)
+
+    # both return the record size and whether `where` accepted it
+    def unpack(self, stream: Reader, this: Any, where: Optional[Where] = None) -> tuple[int, bool]:
+        total_size = 0
+        for kind, var, ser, size in self.steps:
+            if kind == DECODE:
+                field, size = ser._unpack(stream, this) # type: ignore
+                setattr(this, var, field) # type: ignore
+            elif kind == SKIP:
+                skip_bytes(stream, size)
+            elif kind == SKIP_DYNAMIC:
+                size = ser._skip(stream, this) # type: ignore
+            elif kind == CHECK and where is not None and not where(this):
+                return total_size + self.reject.unpack(stream, this)[0], False # type: ignore
+            total_size += size
+        return total_size, True
+
+    def unpack_from(self, buffer: Buffer, offset: int, this: Any, where: Optional[Where] = None) -> tuple[int, bool]:
+        start = offset
+        for kind, var, ser, size in self.steps:
+            if kind == DECODE:
+                field, size = ser._unpack_from(buffer, offset, this) # type: ignore
+                setattr(this, var, field) # type: ignore
+            elif kind == SKIP_DYNAMIC:
+                size = ser._skip_from(buffer, offset, this) # type: ignore
+            elif kind == CHECK and where is not None and not where(this):
+                offset += self.reject.unpack_from(buffer, offset, this)[0] # type: ignore
+                return offset - start, False
+            offset += size
+        return offset - start, True
@@ -0,0 +1,77 @@
+import io
+from typing import Any, Optional
+
+DEFAULT_READ_AHEAD = 64 * 1024
+
+# attribute under which the decoder keeps its reader on a caller's raw stream
+_OWNED = "_struc2_read_ahead"
+
+
+class _CountingRaw(io.RawIOBase):
+    # counts bytes pulled from the caller's stream, so the reader can tell how much it holds
+    consumed: int
+
+    def __init__(self, raw: Any):
+        self._raw = raw
+        self.consumed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> Optional[int]:
+        n = self._raw.readinto(b)
+        if n:
+            self.consumed += n
+        return n
+
+    def tell(self) -> int:
+        return self.consumed
+
+
+class ReadAheadReader(io.BufferedReader):
+    # never closes or seeks the wrapped stream itself, bytes it holds are returned by `release`
+    source: Any
+
+    def __init__(self, raw: Any, buffer_size: int = DEFAULT_READ_AHEAD):
+        self._counter = _CountingRaw(raw)
+        super().__init__(self._counter, buffer_size)
+        self.source = raw
+
+    def pending(self) -> int:
+        return self._counter.consumed - self.tell()
+
+    def release(self) -> bytes:
+        leftover = self.read(self.pending())
+        if leftover and self.source.seekable():
+            self.source.seek(-len(leftover), io.SEEK_CUR)
+            return b""
+        return leftover
+
+
+def is_unbuffered(stream: Any) -> bool:
+    return isinstance(stream, io.RawIOBase)
+
+
+# `n` bytes, fewer only at the end of the stream: raw reads may return less than asked for
+def read_exactly(stream: Any, n: int) -> bytes:
+    data = stream.read(n) or b""
+    while len(data) < n and (more := stream.read(n - len(data))):
+        data += more
+    return data
+
+
+def read_ahead(stream: Any, buffer_size: int = DEFAULT_READ_AHEAD) -> ReadAheadReader:
+    reader: Optional[ReadAheadReader] = getattr(stream, _OWNED, None)
+    if reader is None:
+        reader = ReadAheadReader(stream, buffer_size)
+        setattr(stream, _OWNED, reader)
+    return reader
+
+
+def hand_back(stream: Any) -> bytes:
+    # seekable streams are rewound to the end of the last record, others get the bytes back
+    reader: Optional[ReadAheadReader] = getattr(stream, _OWNED, None)
+    if reader is None:
+        return b""
+    delattr(stream, _OWNED)
+    return reader.release()
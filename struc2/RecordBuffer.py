@@ -0,0 +1,72 @@
+import struct
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+from .Serialized import Buffer, truncated
+from .Limits import LimitExceeded
+
+T = TypeVar("T")
+
+# (buffer, offset) -> (record, size, matched)
+Decode = Callable[[Buffer, int], tuple[T, int, bool]]
+
+# bytes a record may take when nothing bounds it, past that a record still cut is an error
+DEFAULT_MAX_RECORD = 64 * 1024 * 1024
+
+
+class RecordBuffer(Generic[T]):
+    # bytes not decoded yet, records are decoded out of it by offset. A record cut at the end
+    # of the buffered bytes is decoded again once more bytes are fed, the bytearray is reused.
+    # Other decode errors are raised as they happen
+    data: bytearray
+    offset: int
+    # size of the record when it doesn't depend on data, shorter buffers aren't even tried
+    record_size: Optional[int]
+    # bytes buffered for one record before giving up on completing it
+    max_record: int
+
+    def __init__(self, record_size: Optional[int] = None, max_record: Optional[int] = None):
+        self.data = bytearray()
+        self.offset = 0
+        self.record_size = record_size
+        self.max_record = DEFAULT_MAX_RECORD if max_record is None else max_record
+        # why the last record tried couldn't be decoded yet
+        self._cut: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.data) - self.offset
+
+    def feed(self, chunk: bytes) -> None:
+        if self.offset:
+            del self.data[:self.offset]
+            self.offset = 0
+        self.data += chunk
+
+    def records(self, decode: Decode[T]) -> Iterator[tuple[T, bool]]:
+        with memoryview(self.data) as view:
+            end = len(view)
+            min_size = self.record_size or 1
+            while end - self.offset >= min_size:
+                try:
+                    record, size, matched = decode(view, self.offset)
+                except struct.error as e:
+                    if not truncated(e):
+                        raise
+                    self._wait(end, e)
+                    return
+                if self.offset + size > end:
+                    self._wait(end, None)
+                    return
+                self._cut = None
+                self.offset += size
+                yield record, matched
+
+    def _wait(self, end: int, error: Optional[struct.error]) -> None:
+        if end - self.offset >= self.max_record:
+            raise LimitExceeded("max_record", end - self.offset, self.max_record) from error
+        # the message only: the traceback would keep slices of the buffer alive
+        self._cut = None if error is None else str(error)
+
+    def finish(self) -> None:
+        if len(self):
+            reason = "" if self._cut is None else f": {self._cut}"
+            raise struct.error(f"Truncated record, {len(self)} bytes left at the end of the stream{reason}")
@@ -0,0 +1,171 @@
+import struct
+from typing import Any, Callable, Optional
+
+from .Serialized import AsyncReader, Buffer, Reader, Serialized, SerializedDecoder, SerializedFactory, Truncated, find, skip_bytes, truncated
+from .Registry import register_type
+from .RecordBuffer import Decode
+from .Framed import FrameSerialized
+from .Limits import LimitExceeded
+
+DEFAULT_WINDOW = 64 * 1024
+
+Tags = list[tuple[str, Serialized[Any]]]
+
+
+class MagicError(ValueError):
+    def __init__(self, expected: bytes, found: bytes):
+        super().__init__(f"Bad magic: expected {expected!r}, found {found!r}")
+        self.expected = expected
+        self.found = found
+
+
+# constant sync marker, e.g. Tag[bytes, b"\xaa\x55", "magic"]: decoding fails unless it matches
+@register_type
+class SerializedMagic(SerializedFactory[bytes]):
+    _name = "magic"
+
+    marker: bytes
+
+    def __init__(self, marker: bytes):
+        if not marker:
+            raise ValueError("Magic marker can't be empty")
+        self.marker = bytes(marker)
+
+    def _check(self, found: Any) -> tuple[bytes, int]:
+        if found != self.marker:
+            raise MagicError(self.marker, bytes(found))
+        return self.marker, len(self.marker)
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[bytes, int]:
+        return self._check(stream.read(len(self.marker)))
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[bytes, int]:
+        return self._check(await stream.read(len(self.marker)))
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[bytes, int]:
+        found = buffer[offset:offset + len(self.marker)]
+        if len(found) < len(self.marker):
+            raise Truncated(f"unpack requires a buffer of {len(self.marker)} bytes")
+        return self._check(found)
+
+    def _size(self) -> Optional[int]:
+        return len(self.marker)
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    # skipped markers aren't checked
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        skip_bytes(stream, len(self.marker))
+        return len(self.marker)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return len(self.marker)
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return self.marker
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        pass
+
+
+# the magic field and its offset in the record, fields before it must have a fixed size
+def magic(tags: Tags) -> tuple[SerializedMagic, int]:
+    offset = 0
+    for var, t in tags:
+        if isinstance(t, SerializedMagic):
+            return t, offset
+        size = t._size()
+        if size is None:
+            raise ValueError(f"Field `{var}` before the magic field must have a fixed size")
+        offset += size
+    raise ValueError("Struct has no magic field")
+
+
+# size of the fixed size fields starting the record, and (offset, type) of those of them giving the
+# length of a Frame, which can be bounds checked before decoding anything
+def _lengths(tags: Tags) -> tuple[int, list[tuple[int, Serialized[Any]]]]:
+    offsets = dict[str, tuple[int, Serialized[Any]]]()
+    prefix = 0
+    for var, t in tags:
+        size = t._size()
+        if size is None:
+            break
+        offsets[var] = (prefix, t)
+        prefix += size
+    lengths = [offsets[t.length] for _, t in tags if isinstance(t, FrameSerialized) and t.length in offsets]
+    return prefix, lengths
+
+
+# (record, skipped, size) of the first valid record in `buffer`. Candidates are found by searching
+# the marker, their fixed size start and Frame lengths checked against the end of the buffer and
+# `max_record`, then they are fully decoded, which verifies checksums, and passed to `valid`.
+# Without a record, `skipped` is how many leading bytes can't start one and can be dropped
+def resync_from(
+    tags: Tags,
+    decode: Decode[Any],
+    buffer: Buffer,
+    valid: Optional[Callable[[Any], bool]] = None,
+    max_record: Optional[int] = None,
+) -> tuple[Optional[Any], int, int]:
+    t, at = magic(tags)
+    prefix, lengths = _lengths(tags)
+    end = len(buffer)
+    pos = at
+    # first candidate that may be a record cut by the end of the buffer
+    retry: Optional[int] = None
+    while (found := find(buffer, t.marker, pos)) >= 0:
+        start = found - at
+        pos = found + 1
+        try:
+            if start + prefix > end:
+                raise Truncated("record start runs past the end")
+            for offset, length in lengths:
+                n = length._unpack_from(buffer, start + offset, None)[0]
+                if max_record is not None and n > max_record:
+                    raise LimitExceeded("max_record", n, max_record)
+                if start + prefix + n > end:
+                    raise Truncated(f"frame of {n} bytes runs past the end")
+            record, size, _ = decode(buffer, start)
+        except struct.error as e:
+            if truncated(e) and retry is None:
+                retry = start
+            continue
+        except ValueError: # wrong checksum, another magic field or a limit exceeded
+            continue
+        if start + size > end:
+            if retry is None:
+                retry = start
+            continue
+        if valid is None or valid(record):
+            return record, start, size
+    keep = max(end - len(t.marker) + 1 - at, 0)
+    return None, keep if retry is None else min(retry, keep), 0
+
+
+# same over a seekable stream read in windows, it's left right after the record found or at its end
+def resync_stream(
+    tags: Tags,
+    decode: Decode[Any],
+    stream: Reader,
+    valid: Optional[Callable[[Any], bool]],
+    window: int,
+    max_record: Optional[int] = None,
+) -> tuple[Optional[Any], int, int]:
+    if not stream.seekable():
+        raise ValueError("resync needs a buffer or a seekable stream")
+    origin = stream.tell()
+    data = bytearray()
+    skipped = 0
+    while True:
+        chunk = stream.read(window)
+        data += chunk
+        with memoryview(data) as view:
+            record, skip, size = resync_from(tags, decode, view, valid, max_record)
+        if record is not None:
+            stream.seek(origin + skipped + skip + size)
+            return record, skipped + skip, size
+        if not chunk:
+            return None, skipped + len(data), 0
+        del data[:skip]
+        skipped += skip
@@ -0,0 +1,136 @@
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_CAPACITY = 1 << 20
+
+# header: write (head) and read (tail) counters as native u64s, both only ever grow. The producer
+# writes head, the consumer writes tail, except that the producer moves an empty ring's tail along
+# with its head. Each counter is updated with a single aligned 8 byte store once the frames it
+# covers are written (or read), which other processes see in that order on x86 (TSO) only: weaker
+# memory models such as ARM's would need barriers Python can't issue
+_HEAD = 0
+_TAIL = 1
+_HEADER_SIZE = 64 # counters on their own cache line
+
+# frames are a u32 length and the packed record, never split by the end of the ring
+_LENGTH = struct.Struct("<I")
+_WRAP = 0xFFFFFFFF
+
+
+class Ring(Generic[T]):
+    # single producer / single consumer queue of records of `schema` in shared memory: the
+    # producer packs records straight into the ring, the consumer decodes them from it in place.
+    # Other processes `attach` by `name`; the creator unlinks the memory once both are done
+    schema: Any
+    capacity: int
+
+    def __init__(self, schema: type[T], capacity: int = DEFAULT_CAPACITY, name: Optional[str] = None):
+        self.schema = schema
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        buf = self._shm.buf
+        self.capacity = len(buf) - _HEADER_SIZE
+        self._counters = buf[:16].cast("Q")
+        if self._owner:
+            self._counters[_HEAD] = self._counters[_TAIL] = 0
+        self._data = buf[_HEADER_SIZE:]
+        self._decode = schema._buffer_decoder(None, None) # type: ignore
+
+    @classmethod
+    def attach(cls, schema: type[T], name: str) -> "Ring[T]":
+        return cls(schema, name=name)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        counters = self._counters
+        return max(0, counters[_HEAD] - counters[_TAIL])
+
+    # frames fitting in the free space are written, then published with one counter update;
+    # returns how many of `records` were pushed
+    def push_many(self, records: Iterable[T]) -> int:
+        data, capacity, counters = self._data, self.capacity, self._counters
+        head = counters[_HEAD]
+        tail = counters[_TAIL]
+        pushed = 0
+        for record in records:
+            packed = record.pack() # type: ignore
+            frame = _LENGTH.size + len(packed)
+            if frame > capacity:
+                raise ValueError(f"Record of {len(packed)} bytes doesn't fit a ring of {capacity} bytes")
+            pos = head % capacity
+            if frame > capacity - pos:
+                if head == tail:
+                    # everything was read: restart both counters at the ring start, the consumer
+                    # sees head == tail throughout as head is stored last
+                    head = tail = head - pos + capacity
+                    counters[_TAIL] = tail
+                    counters[_HEAD] = head
+                elif tail - (head - pos) >= frame:
+                    # the consumer is past the first `frame` bytes of this lap: skip to them
+                    if capacity - pos >= _LENGTH.size:
+                        _LENGTH.pack_into(data, pos, _WRAP)
+                    head += capacity - pos
+                else:
+                    break
+                pos = 0
+            elif head + frame - tail > capacity:
+                break
+            _LENGTH.pack_into(data, pos, len(packed))
+            data[pos + _LENGTH.size:pos + frame] = packed
+            head += frame
+            pushed += 1
+        counters[_HEAD] = head
+        return pushed
+
+    def push(self, record: T) -> bool:
+        return self.push_many((record,)) == 1
+
+    # up to `max_count` records, the space they took is released after all are decoded
+    def pop_many(self, max_count: int = 1 << 30) -> list[T]:
+        data, capacity, decode, counters = self._data, self.capacity, self._decode, self._counters
+        head = counters[_HEAD]
+        tail = start = counters[_TAIL]
+        records = list[T]()
+        while tail < head and len(records) < max_count:
+            pos = tail % capacity
+            if capacity - pos < _LENGTH.size:
+                tail += capacity - pos
+                continue
+            length = _LENGTH.unpack_from(data, pos)[0]
+            if length == _WRAP:
+                tail += capacity - pos
+                continue
+            begin = pos + _LENGTH.size
+            records.append(decode(data[begin:begin + length], 0)[0])
+            tail += _LENGTH.size + length
+        # untouched when nothing was read, the producer may be restarting an empty ring
+        if tail != start:
+            counters[_TAIL] = tail
+        return records
+
+    def pop(self) -> Optional[T]:
+        records = self.pop_many(1)
+        return records[0] if records else None
+
+    def close(self) -> None:
+        self._counters.release()
+        self._data.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> "Ring[T]":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
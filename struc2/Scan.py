@@ -0,0 +1,24 @@
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class Scan(Generic[T]):
+    # iterator over records accepted by a `where` predicate, counts records seen and accepted
+    scanned: int
+    matched: int
+
+    def __init__(self, records: Callable[["Scan[T]"], Iterator[T]]):
+        self.scanned = 0
+        self.matched = 0
+        self._records = records(self)
+
+    def __iter__(self) -> "Scan[T]":
+        return self
+
+    def __next__(self) -> T:
+        return next(self._records)
+
+    @property
+    def selectivity(self) -> float:
+        return self.matched / self.scanned if self.scanned else 0.0
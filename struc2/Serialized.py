@@ -1,6 +1,25 @@
-from asyncio import StreamReader as AsyncReader
-from io import IOBase as Reader
-from typing import Any, Generic, Protocol, TypeVar, cast, runtime_checkable
+import struct
+from io import IOBase as Reader, BytesIO, SEEK_CUR, SEEK_END
+from typing import TYPE_CHECKING, Any, Generic, Optional, Protocol, TypeVar, cast, runtime_checkable
+
+if TYPE_CHECKING:
+    from asyncio import StreamReader as AsyncReader
+else:
+    # only used in annotations: asyncio is imported by the async entry points that need it
+    AsyncReader = "asyncio.StreamReader"
+
+# buffer path decodes from a byte-formatted memoryview with explicit offsets
+Buffer = memoryview
+
+
+# data ends before the value does: more bytes may complete it, unlike other decode errors
+class Truncated(struct.error):
+    pass
+
+
+# the decode failed for lack of bytes (struct's own messages for short buffers included)
+def truncated(error: struct.error) -> bool:
+    return isinstance(error, Truncated) or str(error).startswith(("unpack_from requires", "unpack requires"))
 
 RetT = TypeVar("RetT", covariant=True)
 
@@ -10,6 +29,24 @@ class SerializedDecoder(Protocol, Generic[RetT]):
 
     async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[RetT, int]: ...
 
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[RetT, int]: ...
+
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[RetT], int]: ...
+
+    def _size(self) -> Optional[int]: ...
+
+    def _depends(self) -> Optional[frozenset[str]]: ...
+
+    def _skip(self, stream: Reader, instance: Any) -> int: ...
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int: ...
+
+    def _refill(self, stream: Reader, instance: Any, out: Any) -> tuple[RetT, int]: ...
+
+    def _refill_from(self, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[RetT, int]: ...
+
+    def _pack(self, value: Any, instance: Any) -> bytes: ...
+
 
 InT = TypeVar("InT", contravariant=True) # python requires
 @runtime_checkable
@@ -24,4 +61,73 @@ class Serialized(
 class SerializedFactory(Generic[RetT]):
     @classmethod
     def create(cls: type[Any], *args: Any, **kwargs: Any) -> Serialized[RetT]:
-        return cast(Serialized[RetT], cls(*args, **kwargs))
\ No newline at end of file
+        return cast(Serialized[RetT], cls(*args, **kwargs))
+
+    # defaults below let types implementing only `_unpack` work everywhere, built-in types override them
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[RetT, int]:
+        with BytesIO(buffer[offset:]) as stream:
+            return cast(Serialized[RetT], self)._unpack(stream, instance)
+
+    # `count` consecutive values, types override it to decode a whole array in one call
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[RetT], int]:
+        r = list[RetT]()
+        start = offset
+        for _ in range(count):
+            res, read = self._unpack_from(buffer, offset, instance)
+            r.append(res)
+            offset += read
+        return r, offset - start
+
+    # number of bytes the value always takes, None if it depends on the data
+    def _size(self) -> Optional[int]:
+        return None
+
+    # fields of the instance read while decoding, None if unknown
+    def _depends(self) -> Optional[frozenset[str]]:
+        return None
+
+    # move past the value without building it, returns number of bytes skipped
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return cast(Serialized[RetT], self)._unpack(stream, instance)[1]
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._unpack_from(buffer, offset, instance)[1]
+
+    # decode reusing `out`, the field's previous value, where the type can (lists, structs)
+    def _refill(self, stream: Reader, instance: Any, out: Any) -> tuple[RetT, int]:
+        return cast(Serialized[RetT], self)._unpack(stream, instance)
+
+    def _refill_from(self, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[RetT, int]:
+        return self._unpack_from(buffer, offset, instance)
+
+    # bytes `value` is decoded from, `instance` is the struct being packed
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        raise NotImplementedError(f"`{type(self).__name__}` can't be packed")
+
+
+def skip_bytes(stream: Reader, n: int) -> None:
+    if stream.seekable():
+        stream.seek(n, SEEK_CUR)
+    else:
+        stream.read(n)
+
+
+def at_eof(stream: Reader) -> bool:
+    peek = getattr(stream, "peek", None)
+    if peek is not None:
+        return not peek(1)
+    if not stream.seekable():
+        raise ValueError("Can't detect end of a stream that is neither seekable nor peekable")
+    pos = stream.tell()
+    end = stream.seek(0, SEEK_END)
+    stream.seek(pos)
+    return pos >= end
+
+
+def find(buffer: Buffer, sub: bytes, start: int) -> int:
+    obj = buffer.obj
+    if getattr(obj, "find", None) is not None and len(obj) == buffer.nbytes:
+        return obj.find(sub, start)
+    pos = bytes(buffer[start:]).find(sub)
+    return pos if pos < 0 else pos + start
\ No newline at end of file
@@ -1,9 +1,13 @@
 import struct
-from typing import TYPE_CHECKING, Annotated, Any, Callable, Optional, TypeVar
+from collections import namedtuple
+from typing import TYPE_CHECKING, Annotated, Any, Callable, Mapping, Optional, TypeVar, cast
 
 from .defs import Endian
-from .Serialized import AsyncReader, Generic, Reader, SerializedFactory, SerializedDecoder
+from .Serialized import AsyncReader, Buffer, Generic, Reader, SerializedFactory, SerializedDecoder, Truncated, find, skip_bytes
 from .Registry import register_type
+from .Dynamic import callback_names
+from .Context import zero_copy
+from .Limits import LimitExceeded, bound, check
 
 # if TYPE_CHECKING:
 from .Serialized import RetT
@@ -19,20 +23,41 @@ class SerializedSimple(SerializedFactory["RetT"], Generic[RetT]):
     struct_type: str
     struct_type_size: int
     _endian: Endian
+    _struct: struct.Struct
 
     def __init__(self, endian: Endian = Endian.Big):
         self._endian = endian
+        self._struct = struct.Struct(f"{endian.value}{self.struct_type}")
 
     def _unpack(self, stream: Reader, instance: Any) -> tuple[RetT, int]:
-        return struct.unpack(
-            f"{self._endian.value}{self.struct_type}", stream.read(self.struct_type_size)
-        )[0], self.struct_type_size
+        return self._struct.unpack(stream.read(self.struct_type_size))[0], self.struct_type_size
 
     async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[RetT, int]:
-        return struct.unpack(
-            f"{self._endian.value}{self.struct_type}",
-            await stream.read(self.struct_type_size),
-        )[0], self.struct_type_size
+        return self._struct.unpack(await stream.read(self.struct_type_size))[0], self.struct_type_size
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[RetT, int]:
+        return self._struct.unpack_from(buffer, offset)[0], self.struct_type_size
+
+    # one struct call for the whole array, formats are cached by the struct module
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[RetT], int]:
+        fmt = f"{self._endian.value}{count}{self.struct_type}"
+        return list(struct.unpack_from(fmt, buffer, offset)), count * self.struct_type_size
+
+    def _size(self) -> Optional[int]:
+        return self.struct_type_size
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        skip_bytes(stream, self.struct_type_size)
+        return self.struct_type_size
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self.struct_type_size
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return self._struct.pack(value)
 
     def _compose(self, ser: SerializedDecoder[Any]) -> None:
         pass
@@ -49,20 +74,121 @@ class SerializedString(SerializedFactory[bytes]):
 
     def _unpack(self, stream: Reader, instance: Any) -> tuple[bytes, int]:
         if self._length is not None:
+            check("max_string", self._length)
             return stream.read(self._length), self._length
         s = b""
+        limit = bound("max_string")
         while (ch := stream.read(1)) != self._eof_char:
+            if not ch:
+                raise Truncated("unterminated cstring")
             s += ch
+            if limit is not None and len(s) > limit:
+                raise LimitExceeded("max_string", len(s), limit)
         return s, len(s) + 1
 
     async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[bytes, int]:
         if self._length is not None:
+            check("max_string", self._length)
             return await stream.read(self._length), self._length
         s = b""
+        limit = bound("max_string")
         while (ch := await stream.read(1)) != self._eof_char:
+            if not ch:
+                raise Truncated("unterminated cstring")
             s += ch
+            if limit is not None and len(s) > limit:
+                raise LimitExceeded("max_string", len(s), limit)
         return s, len(s) + 1
 
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[bytes, int]:
+        if self._length is not None:
+            check("max_string", self._length)
+            end, size = offset + self._length, self._length
+        else:
+            end = self._find_end(buffer, offset)
+            size = end - offset + 1
+        view = buffer[offset:end]
+        return cast(bytes, view) if zero_copy.get() else bytes(view), size
+
+    def _find_end(self, buffer: Buffer, offset: int) -> int:
+        end = find(buffer, self._eof_char, offset)
+        if end < 0:
+            raise Truncated("unterminated cstring")
+        check("max_string", end - offset)
+        return end
+
+    def _size(self) -> Optional[int]:
+        return self._length
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        if self._length is not None:
+            skip_bytes(stream, self._length)
+            return self._length
+        return self._unpack(stream, instance)[1]
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        if self._length is not None:
+            return self._length
+        return self._find_end(buffer, offset) - offset + 1
+
+    # sized strings are padded with `_eof_char`
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        value = bytes(value)
+        if self._length is None:
+            if self._eof_char in value:
+                raise struct.error("cstring contains its terminator")
+            return value + self._eof_char
+        if len(value) > self._length:
+            raise struct.error(f"cstring longer than {self._length} bytes")
+        return value.ljust(self._length, self._eof_char)
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        pass
+
+# fixed number of raw bytes as one object, unlike `"[]", "char"`
+@register_type
+class SerializedBytes(SerializedFactory[bytes]):
+    _name = "bytes"
+
+    _length: int
+
+    def __init__(self, length: int):
+        self._length = length
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[bytes, int]:
+        check("max_string", self._length)
+        return stream.read(self._length), self._length
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[bytes, int]:
+        check("max_string", self._length)
+        return await stream.read(self._length), self._length
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[bytes, int]:
+        check("max_string", self._length)
+        view = buffer[offset:offset + self._length]
+        return cast(bytes, view) if zero_copy.get() else bytes(view), self._length
+
+    def _size(self) -> Optional[int]:
+        return self._length
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        skip_bytes(stream, self._length)
+        return self._length
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._length
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        if len(value) != self._length:
+            raise struct.error(f"bytes must be {self._length} long, got {len(value)}")
+        return bytes(value)
+
     def _compose(self, ser: SerializedDecoder[Any]) -> None:
         pass
 
@@ -72,11 +198,21 @@ class SerializedArray(SerializedFactory[list[RetT]], Generic[RetT]):
 
     _length: int
     _ser: SerializedDecoder[RetT]
+    # array of `char`, returned as a memoryview slice in zero copy mode
+    _raw: bool = False
+    # elements transformed a whole array at a time (VDV, Affine), never one by one
+    _whole: bool = False
 
     def __init__(self, length: int):
         self._length = length
 
     def _unpack(self, stream: Reader, instance: Any) -> tuple[list[RetT], int]:
+        check("max_array", self._length)
+        # fixed size elements are read at once and decoded in one `_unpack_many` call
+        if (fixed := self._size()) is not None:
+            return self._ser._unpack_many(memoryview(stream.read(fixed)), 0, self._length, instance)
+        if self._whole:
+            return self._unpack_whole(stream, instance)
         r = list["RetT"]()
         size: int = 0
         for _ in range(self._length):
@@ -86,16 +222,94 @@ class SerializedArray(SerializedFactory[list[RetT]], Generic[RetT]):
         return r, size
 
     async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[list[RetT], int]:
+        check("max_array", self._length)
+        if self._whole:
+            if (fixed := self._size()) is not None:
+                return self._ser._unpack_many(memoryview(await stream.read(fixed)), 0, self._length, instance)
+            inner = cast(Any, self._ser)._ser
+        else:
+            inner = self._ser
         r = list["RetT"]()
         size: int = 0
         for _ in range(self._length):
-            res, read = await self._ser._unpack_async(stream, instance)
+            res, read = await inner._unpack_async(stream, instance)
+            r.append(res)
+            size += read
+        return cast(Any, self._ser)._apply(r) if self._whole else r, size
+
+    # variable size elements of a whole array transform decoded one by one, transformed at once
+    def _unpack_whole(self, stream: Reader, instance: Any) -> tuple[list[RetT], int]:
+        transform = cast(Any, self._ser)
+        r = list[Any]()
+        size: int = 0
+        for _ in range(self._length):
+            res, read = transform._ser._unpack(stream, instance)
             r.append(res)
             size += read
+        return transform._apply(r), size
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[list[RetT], int]:
+        check("max_array", self._length)
+        if self._raw and zero_copy.get():
+            return cast(list[RetT], buffer[offset:offset + self._length]), self._length
+        return self._ser._unpack_many(buffer, offset, self._length, instance)
+
+    def _size(self) -> Optional[int]:
+        size = self._ser._size()
+        return None if size is None else size * self._length
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        size = self._size()
+        if size is not None:
+            skip_bytes(stream, size)
+            return size
+        check("max_array", self._length)
+        return sum(self._ser._skip(stream, instance) for _ in range(self._length))
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        check("max_array", self._length)
+        start = offset
+        for _ in range(self._length):
+            offset += self._ser._skip_from(buffer, offset, instance)
+        return offset - start
+
+    # a list of the same length is filled in place, elements are refilled too
+    def _refill(self, stream: Reader, instance: Any, out: Any) -> tuple[list[RetT], int]:
+        if self._whole or type(out) is not list or len(cast(list[RetT], out)) != self._length:
+            return self._unpack(stream, instance)
+        check("max_array", self._length)
+        r = cast(list[RetT], out)
+        size: int = 0
+        for i in range(self._length):
+            r[i], read = self._ser._refill(stream, instance, r[i])
+            size += read
         return r, size
 
+    def _refill_from(self, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[list[RetT], int]:
+        if self._whole or type(out) is not list or len(cast(list[RetT], out)) != self._length:
+            return self._unpack_from(buffer, offset, instance)
+        check("max_array", self._length)
+        r = cast(list[RetT], out)
+        start = offset
+        for i in range(self._length):
+            r[i], read = self._ser._refill_from(buffer, offset, instance, r[i])
+            offset += read
+        return r, offset - start
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        if len(value) != self._length:
+            raise struct.error(f"array must have {self._length} elements, got {len(value)}")
+        if self._raw and not isinstance(value, list):
+            return bytes(value)
+        return b"".join([self._ser._pack(v, instance) for v in value])
+
     def _compose(self, ser: SerializedDecoder[RetT]) -> None:
         self._ser = ser
+        self._raw = isinstance(ser, char)
+        self._whole = getattr(ser, "_whole", False)
 
 InstT = TypeVar('InstT')
 _Pred = Callable[[InstT, int], bool]
@@ -112,7 +326,10 @@ class SerializedArrayWithPredicate(SerializedFactory[list[RetT]], Generic[RetT,
     def _unpack(self, stream: Reader, instance: InstT) -> tuple[list[RetT], int]:
         r = list["RetT"]()
         size: int = 0
+        limit = bound("max_array")
         while self._predicate(instance, size):
+            if limit is not None and len(r) >= limit:
+                raise LimitExceeded("max_array", len(r) + 1, limit)
             res, read = self._ser._unpack(stream, instance)
             r.append(res)
             size += read
@@ -121,15 +338,128 @@ class SerializedArrayWithPredicate(SerializedFactory[list[RetT]], Generic[RetT,
     async def _unpack_async(self, stream: AsyncReader, instance: InstT) -> tuple[list[RetT], int]:
         r = list["RetT"]()
         size: int = 0
+        limit = bound("max_array")
         while self._predicate(instance, size):
+            if limit is not None and len(r) >= limit:
+                raise LimitExceeded("max_array", len(r) + 1, limit)
             res, read = await self._ser._unpack_async(stream, instance)
             r.append(res)
             size += read
         return r, size
 
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: InstT) -> tuple[list[RetT], int]:
+        r = list["RetT"]()
+        size: int = 0
+        limit = bound("max_array")
+        while self._predicate(instance, size):
+            if limit is not None and len(r) >= limit:
+                raise LimitExceeded("max_array", len(r) + 1, limit)
+            res, read = self._ser._unpack_from(buffer, offset + size, instance)
+            r.append(res)
+            size += read
+        return r, size
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        names, deps = callback_names(self._predicate), self._ser._depends()
+        return None if names is None or deps is None else names | deps
+
+    def _skip(self, stream: Reader, instance: InstT) -> int:
+        size, count = 0, 0
+        limit = bound("max_array")
+        while self._predicate(instance, size):
+            count += 1
+            if limit is not None and count > limit:
+                raise LimitExceeded("max_array", count, limit)
+            size += self._ser._skip(stream, instance)
+        return size
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: InstT) -> int:
+        size, count = 0, 0
+        limit = bound("max_array")
+        while self._predicate(instance, size):
+            count += 1
+            if limit is not None and count > limit:
+                raise LimitExceeded("max_array", count, limit)
+            size += self._ser._skip_from(buffer, offset + size, instance)
+        return size
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return b"".join([self._ser._pack(v, instance) for v in value])
+
     def _compose(self, ser: SerializedDecoder[RetT]) -> None:
         self._ser = ser
 
+# integer read once and split into bit fields, LSB first: {"armed": 1, "mode": 3} are bit 0 and
+# bits 1-3. Fields named with a leading `_` are reserved (skipped, packed as 0), the others are
+# returned as a namedtuple, single bit fields as bools
+@register_type
+class SerializedBits(SerializedFactory[tuple[Any, ...]]):
+    _name = "bits"
+
+    _ser: SerializedDecoder[int]
+    # (name, shift, mask) per field, precompiled from the layout
+    _fields: list[tuple[str, int, int]]
+    _width: int
+
+    def __init__(self, layout: dict[str, int]):
+        self._fields = []
+        shift = 0
+        for name, width in layout.items():
+            if width < 1:
+                raise ValueError(f"Bit field `{name}` must be at least 1 bit wide")
+            if not name.startswith("_"):
+                self._fields.append((name, shift, (1 << width) - 1))
+            shift += width
+        self._width = shift
+        self._type = namedtuple("Bits", [name for name, _, _ in self._fields]) # type: ignore
+
+    def _split(self, word: int) -> tuple[Any, ...]:
+        return self._type._make([
+            bool(word >> shift & mask) if mask == 1 else word >> shift & mask
+            for _, shift, mask in self._fields
+        ])
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[tuple[Any, ...], int]:
+        word, size = self._ser._unpack(stream, instance)
+        return self._split(word), size
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[tuple[Any, ...], int]:
+        word, size = await self._ser._unpack_async(stream, instance)
+        return self._split(word), size
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[tuple[Any, ...], int]:
+        word, size = self._ser._unpack_from(buffer, offset, instance)
+        return self._split(word), size
+
+    def _size(self) -> Optional[int]:
+        return self._ser._size()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance)
+
+    # `value` is the namedtuple or a mapping of field names
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        if isinstance(value, Mapping):
+            value = self._type(**value)
+        word = 0
+        for v, (name, shift, mask) in zip(value, self._fields):
+            if not 0 <= v <= mask:
+                raise struct.error(f"Bit field `{name}` value {v} doesn't fit {mask.bit_length()} bits")
+            word |= int(v) << shift
+        return self._ser._pack(word, instance)
+
+    def _compose(self, ser: SerializedDecoder[int]) -> None:
+        size = ser._size()
+        if size is not None and self._width > size * 8:
+            raise ValueError(f"Bit fields take {self._width} bits, more than the {size * 8} bit word")
+        self._ser = ser
+
 @register_type
 class char(SerializedSimple[bytes]):
     struct_type_size = 1
@@ -1,17 +1,61 @@
-from typing import Any, TypeVar, cast
+from inspect import getattr_static
+from os import PathLike
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Iterator, Optional, TypeVar, Union, cast
 
 from struc2.TagParser import TagParser
 
-from .Serialized import AsyncReader, Reader, SerializedDecoder, SerializedFactory
-import io
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory, at_eof
+from .Projection import Projection, Where
+from .Dynamic import callback_names
+from .Scan import Scan
+from .Checksum import checksums, unpack_checked, unpack_checked_async, unpack_from_checked
+from .RecordBuffer import Decode, RecordBuffer
+from .Compressed import DEFAULT_BLOCK_SIZE, decompressed
+from .Context import borrowed as borrowed_var, with_option, zero_copy as zero_copy_var
+from .Resync import DEFAULT_WINDOW, resync_from, resync_stream
+from . import Native
+from .Chunked import deferring, finish, unpack_deferred
+from .Columnar import Columns, pack_columns
+from .Framed import reads_to_end
+from .Cache import DEFAULT_CACHE_SIZE, DecodeCache
+from .Context import limits as limits_var
+from .Limits import Limits, limited, limited_async, nested, nested_async
+from .Backend import DEFAULT_BACKEND, RecordDecode, calibrate as calibrate_backends, get_backend
+
+if TYPE_CHECKING:
+    import asyncio
+from . import ReadAhead
 
 StructT = TypeVar("StructT", bound='Struct')
 
 class Struct(SerializedFactory['Struct'], TagParser):
+    # "=" fields follow each other without gaps, "@" pads them to the alignment a C compiler
+    # (as reported by ctypes) gives them, byte order still comes from the tags
+    _layout: str = "="
+    # `unpack_b` memoizes records by their bytes when True (or the cache size), False opts out even
+    # when a call asks for it, for structs whose DV/DTR callbacks aren't pure
+    _decode_cache: Union[bool, int, None] = None
+    # bounds on decoding cost (see `Limits`) used when a call doesn't pass its own `limits`,
+    # exceeding one raises LimitExceeded
+    _limits: Optional[Limits] = None
+    # strategy decoding whole records from buffers, one of `Backend.backends()`. None uses the one
+    # `calibrate` picked, "interpreted" until it's called
+    _backend: Optional[str] = None
+
     # i don't use `instance`, because instance is suppused to be deserializable struct in current state
     # for some meta information for dynamic type resolution 
     def _unpack(self: StructT, stream: Reader, instance: StructT) -> tuple[StructT, int]:
+        # nested in another record, counted against `max_depth`
+        if instance is not self:
+            if self._deferring():
+                raise ValueError(f"`{type(self).__name__}` has chunked arrays, it can only be nested in records decoded from buffers")
+            if (limits := limits_var.get()) is not None:
+                return nested(limits, self._unpack, stream, self)
         this = type(self)()
+        if self._checksummed():
+            return this, unpack_checked(self._get_tags(), stream, this)
+        if self._deferring():
+            return this, unpack_deferred(self._get_tags(), stream, this)
         total_size = 0
         for var, t in self._get_tags():
             field, size = t._unpack(stream, this)
@@ -20,7 +64,11 @@ class Struct(SerializedFactory['Struct'], TagParser):
         return this, total_size
 
     async def _unpack_async(self: StructT, stream: AsyncReader, instance: StructT) -> tuple[StructT, int]:
+        if instance is not self and (limits := limits_var.get()) is not None:
+            return await nested_async(limits, self._unpack_async, stream, self)
         this = type(self)()
+        if self._checksummed():
+            return this, await unpack_checked_async(self._get_tags(), stream, this)
         total_size = 0
         for var, t in iter(self._get_tags()):
             field, size = await t._unpack_async(stream, this)
@@ -28,21 +76,535 @@ class Struct(SerializedFactory['Struct'], TagParser):
             total_size += size
         return this, total_size
 
+    def _unpack_from(self: StructT, buffer: Buffer, offset: int, instance: StructT) -> tuple[StructT, int]:
+        if instance is not self and (limits := limits_var.get()) is not None:
+            return nested(limits, self._unpack_from, buffer, offset, self)
+        this = type(self)()
+        if self._checksummed():
+            return this, unpack_from_checked(self._get_tags(), buffer, offset, this)
+        start = offset
+        for var, t in self._get_tags():
+            field, size = t._unpack_from(buffer, offset, this)
+            setattr(this, var, field)
+            offset += size
+        return this, offset - start
+
+    # decode into an existing instance, overwriting its fields and refilling lists and nested structs
+    def _fill(self, stream: Reader, this: Any) -> int:
+        if self._checksummed():
+            return unpack_checked(self._get_tags(), stream, this)
+        if self._deferring():
+            return unpack_deferred(self._get_tags(), stream, this)
+        total_size = 0
+        values = this.__dict__
+        for var, t in self._get_tags():
+            field, size = t._refill(stream, this, values.get(var))
+            setattr(this, var, field)
+            total_size += size
+        return total_size
+
+    def _fill_from(self, buffer: Buffer, offset: int, this: Any) -> int:
+        if self._checksummed():
+            return unpack_from_checked(self._get_tags(), buffer, offset, this)
+        start = offset
+        values = this.__dict__
+        for var, t in self._get_tags():
+            field, size = t._refill_from(buffer, offset, this, values.get(var))
+            setattr(this, var, field)
+            offset += size
+        return offset - start
+
+    def _refill(self: StructT, stream: Reader, instance: Any, out: Any) -> tuple[StructT, int]:
+        if type(out) is not type(self):
+            return self._unpack(stream, instance)
+        if self._deferring():
+            raise ValueError(f"`{type(self).__name__}` has chunked arrays, it can only be nested in records decoded from buffers")
+        if (limits := limits_var.get()) is not None:
+            return out, nested(limits, self._fill, stream, out)
+        return out, self._fill(stream, out)
+
+    def _refill_from(self: StructT, buffer: Buffer, offset: int, instance: Any, out: Any) -> tuple[StructT, int]:
+        if type(out) is not type(self):
+            return self._unpack_from(buffer, offset, instance)
+        if (limits := limits_var.get()) is not None:
+            return out, nested(limits, self._fill_from, buffer, offset, out)
+        return out, self._fill_from(buffer, offset, out)
+
+    def _size(self) -> Optional[int]:
+        cls = type(self)
+        if "_struct_size" not in cls.__dict__:
+            sizes = [t._size() for _, t in cls._get_tags()]
+            cls._struct_size = None if None in sizes else sum(cast(list[int], sizes))
+        return cls._struct_size
+
+    # callbacks of own fields get the nested instance, not the one of the enclosing struct
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._projection(()).unpack(stream, type(self)())[0]
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._projection(()).unpack_from(buffer, offset, type(self)())[0]
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        return b"".join([t._pack(getattr(value, var), value) for var, t in value._get_tags()])
+
+    def pack(self) -> bytes:
+        return self._pack(self, self)
+
+    # records of a fixed size struct packed straight from columns, e.g. {"x": xs, "y": ys}: lists,
+    # arrays or numpy arrays (rows of `n` for array fields), magic fields need none. Packed into `out`
+    # when given, which must hold them all, else into a new bytearray; returns the buffer
+    @classmethod
+    def pack_many(cls, columns: Columns, out: Optional[Any] = None) -> Any:
+        return pack_columns(cls._get_tags(), columns, out)
+
     def _compose(self, ser: SerializedDecoder[Any]) -> None: 
         raise NotImplementedError
 
     @classmethod
-    def unpack(cls, stream: Reader):
-        i = cls()
-        return cast(cls, i._unpack(stream, i)[0])
+    def _get_tags_(cls) -> list[tuple[str, Any]]:
+        tags = super()._get_tags_()
+        return Native.aligned(tags) if cls._layout == "@" else tags
+
+    # ctypes structure with the same layout, for reading records in place with `from_buffer`
+    # over mmap or shared memory. The struct must have a fixed size and a single byte order
+    @classmethod
+    def as_ctypes(cls) -> Any:
+        if "_ctypes" not in cls.__dict__:
+            cls._ctypes = Native.structure(cls.__name__, cls._get_tags(), cls._layout == "@", cls()._size())
+        return cls._ctypes
+
+    # records with Checksum fields are decoded through checksumming paths
+    @classmethod
+    def _checksummed(cls) -> bool:
+        checked: Optional[bool] = cls.__dict__.get("_checked")
+        if checked is None:
+            checked = cls._checked = bool(checksums(cls._get_tags()))
+        return checked
+
+    # checksums cover bytes rather than fields, so checksummed records are decoded whole (and
+    # verified) even with `fields` or `where`: all their fields are set, `where` still picks records
+    @classmethod
+    def _decodes_whole(cls, fields: Optional[Iterable[str]], where: Optional[Where]) -> bool:
+        if fields is None and where is None:
+            return True
+        if not cls._checksummed():
+            return False
+        if fields is not None:
+            cls._projection(fields) # unknown fields are refused all the same
+        return True
+
+    # records memoized by `unpack_b`, with hit statistics
+    @classmethod
+    def decode_cache(cls) -> DecodeCache[Any]:
+        cache: Optional[DecodeCache[Any]] = cls.__dict__.get("_cache")
+        if cache is None:
+            option = cls._decode_cache
+            size = option if type(option) is int else DEFAULT_CACHE_SIZE
+            cache = cls._cache = DecodeCache(size)
+        return cache
+
+    # name of the backend decoding this struct's records from buffers
+    @classmethod
+    def backend(cls) -> str:
+        return cls._backend or cls.__dict__.get("_calibrated") or DEFAULT_BACKEND
 
     @classmethod
-    def unpack_b(cls, bytes_array: bytes):
-        with io.BytesIO(bytes_array) as stream:
-            i = cls()
+    def _record_decoder(cls) -> RecordDecode:
+        decode: Optional[RecordDecode] = cls.__dict__.get("_record_decode")
+        if decode is None:
+            backend = get_backend(cls.backend())
+            if not backend.eligible(cls):
+                raise ValueError(f"Backend `{backend.name}` can't decode `{cls.__name__}`")
+            decode = cls._record_decode = backend.build(cls)
+        return decode
+
+    # times every eligible backend decoding `sample`, a record's bytes, and pins the fastest one
+    # for this struct unless `_backend` names one. Returns seconds per record by backend
+    @classmethod
+    def calibrate(cls, sample: bytes, number: int = 1000) -> dict[str, float]:
+        timings = calibrate_backends(cls, memoryview(sample).cast("B"), number)
+        cls._calibrated = min(timings, key=timings.__getitem__, default=DEFAULT_BACKEND)
+        if "_record_decode" in cls.__dict__:
+            del cls._record_decode
+        return timings
+
+    # records with chunked arrays stop at them when decoded from streams, see `Chunked`
+    @classmethod
+    def _deferring(cls) -> bool:
+        deferred: Optional[bool] = cls.__dict__.get("_deferred")
+        if deferred is None:
+            deferred = cls._deferred = deferring(cls._get_tags())
+        return deferred
+
+    @classmethod
+    def _stream_projection(cls, fields: Optional[Iterable[str]], where: Optional[Where]) -> Projection:
+        if cls._deferring():
+            raise ValueError("Records with chunked arrays can't be projected or filtered from streams")
+        return cls._scan_projection(fields, where)
+
+    @classmethod
+    def _projection(cls, fields: Iterable[str], check: Optional[frozenset[str]] = None) -> Projection:
+        key = (frozenset(fields), check)
+        projections: Optional[dict[tuple[frozenset[str], Optional[frozenset[str]]], Projection]]
+        projections = cls.__dict__.get("_projections")
+        if projections is None:
+            projections = cls._projections = {}
+        if (projection := projections.get(key)) is None:
+            projection = projections[key] = Projection(cls._get_tags(), *key)
+        return projection
+
+    # plan for a scan: `where` is compiled in by the names of fields it reads. Methods and
+    # properties of the struct it reads may read any field
+    @classmethod
+    def _scan_projection(cls, fields: Optional[Iterable[str]], where: Optional[Where]) -> Projection:
+        names = [var for var, _ in cls._get_tags()]
+        check = None
+        if where is not None:
+            deps = callback_names(where)
+            if deps is not None and any(callable(a) or isinstance(a, property) for a in (
+                getattr_static(cls, name, None) for name in deps.difference(names)
+            )):
+                deps = None
+            check = frozenset(names) if deps is None else deps.intersection(names)
+        return cls._projection(names if fields is None else fields, check)
+
+    @classmethod
+    def _unpack_stream(cls, stream: Reader, fields: Optional[Iterable[str]], limits: Optional[Limits]):
+        limits = cls._limits if limits is None else limits
+        if limits is not None:
+            return limited(limits, cls._decode_stream)(stream, fields)[0]
+        i = cls()
+        if cls._decodes_whole(fields, None):
             return cast(cls, i._unpack(stream, i)[0])
+        cls._stream_projection(fields, None).unpack(stream, i)
+        return i
 
     @classmethod
-    async def unpack_async(cls, stream: AsyncReader):
+    def _decode_stream(cls: type[StructT], stream: Reader, fields: Optional[Iterable[str]]) -> tuple[StructT, int, bool]:
         i = cls()
-        return cast(cls, (await i._unpack_async(stream, i))[0])
+        if cls._decodes_whole(fields, None):
+            this, size = i._unpack(stream, i)
+            return this, size, True
+        return i, cls._stream_projection(fields, None).unpack(stream, i)[0], True
+
+    # unbuffered readers (FileIO, raw socket files) get a read-ahead buffer of `read_ahead` bytes,
+    # seekable ones are rewound to the record end afterwards, for others see `ReadAhead.read_ahead`.
+    # Fixed size records are read from seekable ones in a single read of their size, nothing to rewind.
+    # with `fields` only those (and fields they depend on) are decoded, the rest is skipped
+    @classmethod
+    def unpack(
+        cls,
+        stream: Reader,
+        read_ahead: int = ReadAhead.DEFAULT_READ_AHEAD,
+        fields: Optional[Iterable[str]] = None,
+        limits: Optional[Limits] = None,
+    ):
+        if read_ahead and ReadAhead.is_unbuffered(stream):
+            seekable = stream.seekable()
+            if seekable and (size := cls()._size()) is not None:
+                data = memoryview(ReadAhead.read_exactly(stream, size))
+                if fields is None and limits is None and cls._limits is None:
+                    return cast(cls, cls._record_decoder()(data, 0)[0])
+                return cast(cls, cls._buffer_decoder(fields, None, limits=limits)(data, 0)[0])
+            reader = ReadAhead.read_ahead(stream, read_ahead)
+            try:
+                return cls._unpack_stream(cast(Reader, reader), fields, limits)
+            finally:
+                if seekable:
+                    ReadAhead.hand_back(stream)
+        return cls._unpack_stream(stream, fields, limits)
+
+    # with `zero_copy` cstring and byte array fields are memoryview slices of `bytes_array`,
+    # they keep it alive and see any later change to it
+    @classmethod
+    def unpack_b(
+        cls,
+        bytes_array: bytes,
+        fields: Optional[Iterable[str]] = None,
+        zero_copy: bool = False,
+        cache: Optional[bool] = None,
+        limits: Optional[Limits] = None,
+    ):
+        decode = cls._buffer_decoder(fields, None, zero_copy=zero_copy, limits=limits)
+        option = cls._decode_cache
+        if option is not False and (option if cache is None else cache) and fields is None and not zero_copy:
+            # variable size records are keyed on all of `bytes_array`
+            size = cls()._size()
+            key = bytes(bytes_array if size is None else memoryview(bytes_array)[:size])
+            return cast(cls, cls.decode_cache().get(key, lambda b: decode(memoryview(b), 0)[0]))
+        return cast(cls, decode(memoryview(bytes_array).cast("B"), 0)[0])
+
+    # decode into `instance`, overwriting its fields, lists of the same length are refilled in place
+    @classmethod
+    def unpack_into(
+        cls,
+        instance: StructT,
+        stream_or_buffer: Union[Reader, bytes],
+        zero_copy: bool = False,
+        limits: Optional[Limits] = None,
+    ) -> StructT:
+        limits = cls._limits if limits is None else limits
+
+        def fill(stream: Reader) -> tuple[StructT, int]:
+            return instance, instance._fill(stream, instance)
+
+        def fill_from(buffer: Buffer, offset: int) -> tuple[StructT, int]:
+            return instance, instance._fill_from(buffer, offset, instance)
+
+        try:
+            buffer = memoryview(cast(bytes, stream_or_buffer)).cast("B")
+        except TypeError:
+            limited(limits, fill)(cast(Reader, stream_or_buffer))
+        else:
+            with_option(zero_copy_var, zero_copy, limited(limits, fill_from))(buffer, 0)
+        return instance
+
+    # records until the end of the stream; with `where` a record is tested as soon as the fields
+    # the predicate reads are decoded, and the rest of a rejected one is skipped undecoded.
+    # with `reuse` every record is decoded into the same instance: a yielded record is only
+    # valid until the next iteration, copy what has to outlive it
+    @classmethod
+    def iter_unpack(
+        cls: type[StructT],
+        stream: Reader,
+        where: Optional[Where] = None,
+        fields: Optional[Iterable[str]] = None,
+        read_ahead: int = ReadAhead.DEFAULT_READ_AHEAD,
+        reuse: bool = False,
+        limits: Optional[Limits] = None,
+    ) -> Scan[StructT]:
+        projection = None if cls._decodes_whole(fields, where) else cls._stream_projection(fields, where)
+        deferred = cls._deferring()
+        i = cls()
+
+        def decode_one(reader: Reader) -> tuple[StructT, int, bool]:
+            if projection is None:
+                if reuse:
+                    return i, i._fill(reader, i), where is None or bool(where(i))
+                this, size = i._unpack(reader, i)
+                return this, size, where is None or bool(where(this))
+            this = i if reuse else cls()
+            size, matched = projection.unpack(reader, this, where)
+            return this, size, matched
+        decode = limited(cls._limits if limits is None else limits, decode_one)
+
+        def records(scan: Scan[StructT]) -> Iterator[StructT]:
+            reader = stream
+            if read_ahead and ReadAhead.is_unbuffered(stream):
+                reader = cast(Reader, ReadAhead.read_ahead(stream, read_ahead))
+            try:
+                while not at_eof(reader):
+                    this, _, matched = decode(reader)
+                    scan.scanned += 1
+                    if matched:
+                        scan.matched += 1
+                        yield this
+                    if deferred:
+                        finish(cls._get_tags(), this)
+            finally:
+                if reader is not stream and stream.seekable():
+                    ReadAhead.hand_back(stream)
+
+        return Scan(records)
+
+    # (buffer, offset) -> (record, size, matched) for the given projection and predicate
+    @classmethod
+    def _buffer_decoder(
+        cls: type[StructT],
+        fields: Optional[Iterable[str]],
+        where: Optional[Where],
+        reuse: bool = False,
+        zero_copy: bool = False,
+        limits: Optional[Limits] = None,
+    ) -> Decode[StructT]:
+        decode = limited(cls._limits if limits is None else limits, cls._plain_buffer_decoder(fields, where, reuse))
+        return with_option(zero_copy_var, True, decode) if zero_copy else decode
+
+    @classmethod
+    def _plain_buffer_decoder(
+        cls: type[StructT], fields: Optional[Iterable[str]], where: Optional[Where], reuse: bool
+    ) -> Decode[StructT]:
+        i = cls()
+        if cls._decodes_whole(fields, where):
+            if reuse:
+                def refill_all(buffer: Buffer, offset: int) -> tuple[StructT, int, bool]:
+                    return i, i._fill_from(buffer, offset, i), where is None or bool(where(i))
+                return refill_all
+
+            record_decode = cls._record_decoder()
+
+            def decode_all(buffer: Buffer, offset: int) -> tuple[StructT, int, bool]:
+                this, size = record_decode(buffer, offset)
+                return this, size, where is None or bool(where(this))
+            return decode_all
+
+        projection = cls._scan_projection(fields, where)
+
+        def decode(buffer: Buffer, offset: int) -> tuple[StructT, int, bool]:
+            this = i if reuse else cls()
+            size, matched = projection.unpack_from(buffer, offset, this, where)
+            return this, size, matched
+        return decode
+
+    @classmethod
+    def iter_unpack_b(
+        cls: type[StructT],
+        bytes_array: bytes,
+        where: Optional[Where] = None,
+        fields: Optional[Iterable[str]] = None,
+        reuse: bool = False,
+        zero_copy: bool = False,
+        limits: Optional[Limits] = None,
+    ) -> Scan[StructT]:
+        decode = cls._buffer_decoder(fields, where, reuse, zero_copy, limits)
+
+        def records(scan: Scan[StructT]) -> Iterator[StructT]:
+            buffer = memoryview(bytes_array).cast("B")
+            offset = 0
+            while offset < len(buffer):
+                this, size, matched = decode(buffer, offset)
+                offset += size
+                scan.scanned += 1
+                if matched:
+                    scan.matched += 1
+                    yield this
+
+        return Scan(records)
+
+    # records of a gzip/zlib/bz2/lzma compressed stream or file: blocks of `block_size` bytes are
+    # decompressed into one reused buffer and records decoded out of it, records cut by a block
+    # boundary are completed with the next block
+    @classmethod
+    def iter_unpack_compressed(
+        cls: type[StructT],
+        path_or_stream: Union[str, PathLike[str], Reader],
+        codec: str = "gzip",
+        where: Optional[Where] = None,
+        fields: Optional[Iterable[str]] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        reuse: bool = False,
+    ) -> Scan[StructT]:
+        decode = with_option(borrowed_var, True, cls._buffer_decoder(fields, where, reuse))
+        buffer = cls._record_buffer()
+
+        def records(scan: Scan[StructT]) -> Iterator[StructT]:
+            opened = isinstance(path_or_stream, (str, PathLike))
+            stream = cast(Reader, open(path_or_stream, "rb") if opened else path_or_stream)
+            try:
+                for block in decompressed(stream, codec, block_size):
+                    buffer.feed(block)
+                    for this, matched in buffer.records(decode):
+                        scan.scanned += 1
+                        if matched:
+                            scan.matched += 1
+                            yield this
+                buffer.finish()
+            finally:
+                if opened:
+                    stream.close()
+
+        return Scan(records)
+
+    # records cut at the end of what was read so far are kept for the next read, up to `max_record`.
+    # Records running to the end of the data would end wherever a read happens to
+    @classmethod
+    def _record_buffer(cls: type[StructT]) -> RecordBuffer[StructT]:
+        if reads_to_end(cls._get_tags()):
+            raise ValueError(f"`{cls.__name__}` has a \"rest[]\" array outside a Frame, its records can't be read in blocks")
+        limits = cls._limits
+        return RecordBuffer[StructT](cls()._size(), None if limits is None else limits.max_record)
+
+    # find the next valid record of a struct with a "magic" field: returns (record, skipped, size),
+    # the record starts `skipped` bytes in. Buffers with no record give (None, skipped, 0), the bytes
+    # after `skipped` may still start one and should be kept for the next call
+    @classmethod
+    def resync(
+        cls: type[StructT],
+        buffer_or_stream: Union[bytes, Reader],
+        valid: Optional[Where] = None,
+        window: int = DEFAULT_WINDOW,
+    ) -> tuple[Optional[StructT], int, int]:
+        decode = cls._buffer_decoder(None, None)
+        max_record = None if cls._limits is None else cls._limits.max_record
+        try:
+            buffer = memoryview(cast(bytes, buffer_or_stream)).cast("B")
+        except TypeError:
+            return resync_stream(cls._get_tags(), decode, cast(Reader, buffer_or_stream), valid, window, max_record)
+        return resync_from(cls._get_tags(), decode, buffer, valid, max_record)
+
+    @classmethod
+    async def unpack_async(cls, stream: AsyncReader, limits: Optional[Limits] = None):
+        i = cls()
+        decode = limited_async(cls._limits if limits is None else limits, i._unpack_async)
+        return cast(cls, (await decode(stream, i))[0])
+
+    # batches of records decoded from whatever `reader` has buffered, a read is only awaited when
+    # no whole record is left. A batch is yielded when it holds `max_batch` records or, with
+    # `max_latency` seconds set, when its first record waited that long for the batch to fill;
+    # without it a batch is yielded as soon as the buffered bytes run out
+    @classmethod
+    async def aiter_unpack(
+        cls: type[StructT],
+        reader: AsyncReader,
+        max_batch: int = 1024,
+        max_latency: Optional[float] = None,
+        where: Optional[Where] = None,
+        fields: Optional[Iterable[str]] = None,
+        read_size: int = ReadAhead.DEFAULT_READ_AHEAD,
+    ) -> AsyncIterator[list[StructT]]:
+        import asyncio
+        decode = with_option(borrowed_var, True, cls._buffer_decoder(fields, where))
+        buffer = cls._record_buffer()
+        loop = asyncio.get_running_loop()
+        batch = list[StructT]()
+        deadline = 0.0
+        while True:
+            for this, matched in buffer.records(decode):
+                if not matched:
+                    continue
+                if not batch and max_latency is not None:
+                    deadline = loop.time() + max_latency
+                batch.append(this)
+                if len(batch) >= max_batch:
+                    yield batch
+                    batch = []
+            if batch and max_latency is None:
+                yield batch
+                batch = []
+            if batch:
+                try:
+                    chunk = await asyncio.wait_for(reader.read(read_size), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    yield batch
+                    batch = []
+                    continue
+            else:
+                chunk = await reader.read(read_size)
+            if not chunk:
+                break
+            buffer.feed(chunk)
+        if batch:
+            yield batch
+        buffer.finish()
+
+    # `aiter_unpack` into a bounded queue: while the consumer lags and the queue is full nothing
+    # more is read from `reader`. `None` is put after the last batch, returns the number of records
+    @classmethod
+    async def unpack_to_queue(
+        cls: type[StructT],
+        reader: AsyncReader,
+        queue: "asyncio.Queue[Optional[list[StructT]]]",
+        max_batch: int = 1024,
+        max_latency: Optional[float] = None,
+        where: Optional[Where] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> int:
+        count = 0
+        async for batch in cls.aiter_unpack(reader, max_batch, max_latency, where, fields):
+            await queue.put(batch)
+            count += len(batch)
+        await queue.put(None)
+        return count
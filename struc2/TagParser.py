@@ -1,7 +1,7 @@
 from .Serialized import Serialized, SerializedFactory
 from .Registry import TypeRegistry
 
-from typing import Annotated, Any, Optional, Union, get_type_hints, Generator
+from typing import Annotated, Any, Optional, Union, cast, get_type_hints, Generator
 
 class TagType:
     ser: Serialized[Any]
@@ -72,6 +72,7 @@ class TagParser:
         
     @classmethod
     def _get_tags(cls) -> list[tuple[str, Serialized[Any]]]:
-        if cls._ser_tags is None:
+        # looked up in own __dict__, subclasses must not reuse tags parsed for a base class
+        if cls.__dict__.get('_ser_tags') is None:
             cls._ser_tags = cls._get_tags_()
-        return cls._ser_tags
\ No newline at end of file
+        return cast(list[tuple[str, Serialized[Any]]], cls._ser_tags)
\ No newline at end of file
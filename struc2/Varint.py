@@ -0,0 +1,149 @@
+import struct
+from typing import Any, Optional
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory, Truncated
+from .Registry import register_type
+
+
+# value and end of the varint at `pos`, None if `data` ends before it does
+def _scan(data: Any, pos: int, max_bytes: Optional[int]) -> Optional[tuple[int, int]]:
+    b = data[pos] if pos < len(data) else 0x80
+    if b < 0x80: # single byte values are the common case
+        return b, pos + 1
+    start, end = pos, len(data)
+    result = shift = 0
+    while pos < end:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if max_bytes is not None and pos - start >= max_bytes:
+            raise struct.error(f"varint longer than {max_bytes} bytes")
+    return None
+
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def _encode(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+# little endian base 128: 7 bits per byte, high bit set on all but the last byte
+class SerializedVarint(SerializedFactory[int]):
+    # longest encoding accepted, None for unbounded
+    _max_bytes: Optional[int] = 10
+    _zigzag: bool = False
+
+    def _value(self, n: int) -> int:
+        return _zigzag(n) if self._zigzag else n
+
+    # buffered streams are scanned in what they already hold, others are read byte by byte
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[int, int]:
+        peek = getattr(stream, "peek", None)
+        if peek is not None and (found := _scan(peek(self._max_bytes or 1), 0, self._max_bytes)) is not None:
+            n, size = found
+            stream.read(size)
+            return self._value(n), size
+        result = shift = size = 0
+        while True:
+            ch = stream.read(1)
+            if not ch:
+                raise Truncated("truncated varint")
+            size += 1
+            result |= (ch[0] & 0x7F) << shift
+            if ch[0] < 0x80:
+                return self._value(result), size
+            shift += 7
+            if self._max_bytes is not None and size >= self._max_bytes:
+                raise struct.error(f"varint longer than {self._max_bytes} bytes")
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[int, int]:
+        result = shift = size = 0
+        while True:
+            ch = await stream.read(1)
+            if not ch:
+                raise Truncated("truncated varint")
+            size += 1
+            result |= (ch[0] & 0x7F) << shift
+            if ch[0] < 0x80:
+                return self._value(result), size
+            shift += 7
+            if self._max_bytes is not None and size >= self._max_bytes:
+                raise struct.error(f"varint longer than {self._max_bytes} bytes")
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[int, int]:
+        found = _scan(buffer, offset, self._max_bytes)
+        if found is None:
+            raise Truncated("truncated varint")
+        return self._value(found[0]), found[1] - offset
+
+    # whole array in one loop over the buffer, without a call per element
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[int], int]:
+        r = list[int]()
+        pos, end = offset, len(buffer)
+        max_bytes, zigzag = self._max_bytes, self._zigzag
+        for _ in range(count):
+            start = pos
+            result = shift = 0
+            while True:
+                if pos >= end:
+                    raise Truncated("truncated varint")
+                b = buffer[pos]
+                pos += 1
+                result |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+                if max_bytes is not None and pos - start >= max_bytes:
+                    raise struct.error(f"varint longer than {max_bytes} bytes")
+            r.append((result >> 1) ^ -(result & 1) if zigzag else result)
+        return r, pos - offset
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return frozenset()
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._unpack_from(buffer, offset, instance)[1]
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        n = int(value)
+        if self._zigzag:
+            n = n << 1 if n >= 0 else (~n << 1) | 1
+        if n < 0:
+            raise struct.error(f"{type(self)._name} can't hold negative {n}") # type: ignore
+        encoded = _encode(n)
+        if self._max_bytes is not None and len(encoded) > self._max_bytes:
+            raise struct.error(f"{value} needs more than {self._max_bytes} bytes")
+        return encoded
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        pass
+
+
+# protobuf varint, up to 64 bits
+@register_type
+class varint(SerializedVarint):
+    _name = "varint"
+
+
+# protobuf sint: zigzag mapped so small negative values stay short
+@register_type
+class svarint(SerializedVarint):
+    _name = "svarint"
+    _zigzag = True
+
+
+# DWARF style unsigned LEB128, any length
+@register_type
+class uleb128(SerializedVarint):
+    _name = "uleb128"
+    _max_bytes = None
@@ -0,0 +1,127 @@
+import struct
+from itertools import repeat
+from operator import add, mul
+from typing import Any, Callable, Optional, Union, cast
+
+from .Serialized import AsyncReader, Buffer, Reader, SerializedDecoder, SerializedFactory, Truncated
+from .SerializedImpl import SerializedSimple
+from .Dynamic import serialized_dynamic
+from . import Accel
+
+
+# function applied to runs of decoded values rather than to each one: arrays of it decode all their
+# elements with one `_unpack_many` call and pass them to the function at once, e.g.
+# Tag[list[float], 1000, "[]", VDV[calibrate], "u16"] where `calibrate` maps a list to a list
+class ListTransform(SerializedFactory[Any]):
+    _ser: SerializedDecoder[Any]
+    # arrays of it decode the composed type and hand all the values to `_apply`, on every path
+    _whole = True
+
+    def _apply(self, values: list[Any]) -> list[Any]:
+        raise NotImplementedError
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        res, read = self._ser._unpack(stream, instance)
+        return self._apply([res])[0], read
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        res, read = await self._ser._unpack_async(stream, instance)
+        return self._apply([res])[0], read
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        res, read = self._ser._unpack_from(buffer, offset, instance)
+        return self._apply([res])[0], read
+
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[Any], int]:
+        values, size = self._ser._unpack_many(buffer, offset, count, instance)
+        return self._apply(values), size
+
+    def _size(self) -> Optional[int]:
+        return self._ser._size()
+
+    def _depends(self) -> Optional[frozenset[str]]:
+        return self._ser._depends()
+
+    def _skip(self, stream: Reader, instance: Any) -> int:
+        return self._ser._skip(stream, instance)
+
+    def _skip_from(self, buffer: Buffer, offset: int, instance: Any) -> int:
+        return self._ser._skip_from(buffer, offset, instance)
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        self._ser = ser
+
+
+@serialized_dynamic
+class VectorizedValue(ListTransform):
+    _f: Callable[[list[Any]], list[Any]]
+
+    def __init__(self, f: Callable[[list[Any]], list[Any]]):
+        self._f = f
+
+    def _apply(self, values: list[Any]) -> list[Any]:
+        return self._f(values)
+
+    # the function isn't elementwise, calling it on one value at a time would give other results
+    def _single(self) -> Any:
+        raise TypeError("VDV functions get whole arrays, use it as the element type of a fixed \"[]\" array or DV for single values")
+
+    def _unpack(self, stream: Reader, instance: Any) -> tuple[Any, int]:
+        return self._single()
+
+    async def _unpack_async(self, stream: AsyncReader, instance: Any) -> tuple[Any, int]:
+        return self._single()
+
+    def _unpack_from(self, buffer: Buffer, offset: int, instance: Any) -> tuple[Any, int]:
+        return self._single()
+
+
+# `value * scale + offset` without a Python call per element, e.g. Affine[0.01, -40.0], Affine[0.5].
+# Arrays of plain numbers are scaled with numpy when it's available. Packing inverts it, rounding
+# for integer types
+@serialized_dynamic
+class Affine(ListTransform):
+    scale: float
+    offset: float
+    # numpy dtype of the composed type when it's a plain number, and the one results are computed in:
+    # float64 or int64, None when int64 could overflow where Python ints don't
+    _dtype: Optional[str] = None
+    _wide: Optional[str] = None
+
+    def __init__(self, params: Union[float, tuple[float, float]]):
+        self.scale, self.offset = params if isinstance(params, tuple) else (params, 0)
+
+    def _apply(self, values: list[Any]) -> list[Any]:
+        if self.scale != 1:
+            values = list(map(mul, values, repeat(self.scale)))
+        if self.offset:
+            values = list(map(add, values, repeat(self.offset)))
+        return values
+
+    def _unpack_many(self, buffer: Buffer, offset: int, count: int, instance: Any) -> tuple[list[Any], int]:
+        if self._wide is not None and count >= Accel.NUMPY_MIN_LENGTH and (np := Accel.numpy()) is not None:
+            size = count * cast(int, self._ser._size())
+            if offset + size > len(buffer):
+                raise Truncated(f"unpack requires a buffer of {size} bytes")
+            values = np.frombuffer(buffer, self._dtype, count, offset).astype(self._wide) * self.scale + self.offset
+            return values.tolist(), size
+        return super()._unpack_many(buffer, offset, count, instance)
+
+    def _pack(self, value: Any, instance: Any) -> bytes:
+        raw = (value - self.offset) / self.scale
+        if self._dtype is not None and self._dtype[-1] not in "fd":
+            raw = round(raw)
+        return self._ser._pack(raw, instance)
+
+    def _compose(self, ser: SerializedDecoder[Any]) -> None:
+        super()._compose(ser)
+        if isinstance(ser, SerializedSimple) and ser.struct_type in Accel.NUMERIC_CODES:
+            self._dtype = f"{ser._endian.value}{ser.struct_type}"
+            if ser.struct_type in "fd" or isinstance(self.scale, float) or isinstance(self.offset, float):
+                self._wide = "float64"
+            else:
+                bits = ser.struct_type_size * 8
+                largest = 1 << bits - 1 if ser.struct_type.islower() else (1 << bits) - 1
+                if largest * abs(self.scale) + abs(self.offset) < 1 << 63:
+                    self._wide = "int64"
+
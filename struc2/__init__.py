@@ -1,7 +1,17 @@
 from .Struct import Struct
 from .TagParser import Tag
 from .defs import BigEndian, LittleEndian
-from . import SerializedImpl
+from . import SerializedImpl, Varint, EncodedArray
+from . import Backend
 from .Dynamic import DynamicValue as DV, DynamicTypeResolution as DTR
+from .Vectorized import VectorizedValue as VDV, Affine
+from .ReadAhead import read_ahead, hand_back
+from .Scan import Scan
+from .Checksum import Checksum, ChecksumError
+from .Conditional import If
+from .Framed import Frame
+from .Resync import MagicError
+from .Intern import Intern, InternTable
+from .Limits import Limits, LimitExceeded
 
-del SerializedImpl # i only need to fill type registry
\ No newline at end of file
+del SerializedImpl, Varint, EncodedArray # i only need to fill type registry
\ No newline at end of file
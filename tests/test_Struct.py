@@ -5,6 +5,8 @@ from typing import Any
 # sys.path.insert(0, "../struc")
 
 from struc import Struct, Tag, LittleEndian, DTR, DV
+from struc.register import register_type
+from struc.Serializable import GenericSeril, ArraySeril
 
 def test_pair():
     class Blank(Struct):
@@ -273,6 +275,113 @@ def test_ignore_tagged_ignore():
     assert p.z == b'123'
     assert p.a == 0xAA
 
+def test_custom_types():
+    @register_type
+    class u24(GenericSeril[int]):
+        data_len = 3
+        struct_fmt = "I"
+
+        def _from_bytes(self, byte_array: bytes) -> tuple[int, int]:
+            return int.from_bytes(byte_array[:3], "little" if self.endian == "<" else "big"), 3
+
+    @register_type
+    class half(GenericSeril[float]):
+        data_len = 2
+        struct_fmt = "e"
+
+    @register_type
+    class reversed_array(ArraySeril[list[Any], Any]):
+        @staticmethod
+        def transform(arr: list[Any]) -> list[Any]:
+            return arr[::-1]
+
+    class A(Struct):
+        x: Tag[int, LittleEndian, "u24"]
+        y: Tag[float, LittleEndian, "half"]
+        z: Tag[list[int], 3, "reversed_array", "u8"]
+
+    p = A.unpack(b"\x01\x02\x03\x00\x3c\x01\x02\x03")
+    assert p.x == 0x030201
+    assert p.y == 1.0
+    assert p.z == [3, 2, 1]
+
+def test_dtr_composed():
+    received = []
+
+    class A(Struct):
+        def sized(self, inner: Any) -> list[Any]:
+            received.append(inner._from_bytes(b"\x00\x07")[0])
+            return [self.size, "[]", "u8"]
+
+        size: Tag[int, "u8"]
+        data: Tag[list[int], DTR[sized], "u16"]
+
+    p = A.unpack(b"\x02\x05\x06")
+    assert p.data == [5, 6]
+    assert received == [7]
+
+def test_custom_types_stream():
+    import io
+    from struc.Serializable import Serializable
+
+    @register_type
+    class u24be(GenericSeril[int]):
+        data_len = 3
+        struct_fmt = "I"
+
+        def _from_bytes(self, byte_array: bytes) -> tuple[int, int]:
+            return int.from_bytes(byte_array[:3], "big"), 3
+
+    @register_type
+    class pascal(Serializable[bytes]):
+        def _from_bytes(self, byte_array: bytes) -> tuple[bytes, int]:
+            n = byte_array[0]
+            if len(byte_array) < n + 1:
+                raise ValueError("pascal string cut")
+            return byte_array[1:n + 1], n + 1
+
+        def __bytes__(self) -> bytes:
+            raise NotImplementedError
+
+    class Pipe(io.RawIOBase):
+        def __init__(self, data: bytes):
+            self.data = io.BytesIO(data)
+
+        def readable(self) -> bool:
+            return True
+
+        def readinto(self, b: Any) -> int:
+            data = self.data.read(len(b))
+            b[:len(data)] = data
+            return len(data)
+
+    class A(Struct):
+        x: Tag[int, "u24be"]
+        name: Tag[bytes, "cstring"]
+
+    # fixed size custom types read only their bytes, the stream needn't be seekable
+    records = A.iter_unpack(io.BufferedReader(Pipe(b"\x00\x00\x05ab\x00" * 3)))
+    assert [(r.x, r.name) for r in records] == [(5, b"ab")] * 3
+
+    class B(Struct):
+        name: Tag[bytes, "pascal"]
+        y: Tag[int, "u8"]
+
+    long = bytes([200]) + b"x" * 200
+    stream = io.BytesIO((long + b"\x09") * 2)
+    assert [(len(r.name), r.y) for r in B.iter_unpack(stream)] == [(200, 9)] * 2
+
+def test_unterminated_cstring():
+    import pytest
+
+    class A(Struct):
+        x: Tag[int, "u8"]
+        name: Tag[bytes, "cstring"]
+
+    assert A.unpack(b"\x01ab\x00").name == b"ab"
+    with pytest.raises(ValueError):
+        A.unpack(b"\x01ab")
+
 def test_benchmark(benchmark: Any):
     class A(Struct):
         x: Tag[int, "u16"]
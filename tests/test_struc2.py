@@ -1,10 +1,20 @@
 from typing import Any, Optional
-from struc2 import Struct, Tag, LittleEndian, DV, DTR
+from struc2 import Struct, Tag, LittleEndian, DV, DTR, read_ahead, hand_back, Checksum, ChecksumError
 from struc2.Serialized import Serialized
 from struc2.SerializedImpl import u16
+from struc2.Ring import Ring
 import aiofiles.tempfile
 import asyncio
 import pytest
+import io
+import tempfile
+import zlib
+import struct
+import ctypes
+import multiprocessing
+import os
+import subprocess
+import sys
 
 def test_pair():
     class Blank(Struct):
@@ -315,6 +325,1101 @@ def test_dtr_and_strings_and_dv_async():
             assert p.value == 27.593 / 10 # type: ignore
     asyncio.run(main())
 
+class CountingRaw(io.RawIOBase):
+    def __init__(self, data: bytes, seekable: bool):
+        self._data = io.BytesIO(data)
+        self._seekable = seekable
+        self.calls = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._seekable
+
+    def seek(self, pos: int, whence: int = 0):
+        return self._data.seek(pos, whence)
+
+    def tell(self):
+        return self._data.tell()
+
+    def readinto(self, b: Any):
+        self.calls += 1
+        return self._data.readinto(b)
+
+def test_read_ahead_unseekable():
+    class A(Struct):
+        x: Tag[int, "u8"]
+        y: Tag[int, "u16"]
+        z: Tag[bytes, "cstring"]
+
+    raw = CountingRaw(b"\x01\x00\x02ab\x00" * 3 + b"tail", seekable=False)
+    for _ in range(3):
+        p = A.unpack(raw)
+        assert (p.x, p.y, p.z) == (1, 2, b"ab")
+    assert raw.calls == 1
+
+    assert read_ahead(raw).peek(2)[:2] == b"ta"
+    assert read_ahead(raw).read(2) == b"ta"
+    assert hand_back(raw) == b"il"
+
+def test_read_ahead_seekable():
+    class A(Struct):
+        x: Tag[int, "u8"]
+        y: Tag[int, LittleEndian, "u32"]
+
+    with tempfile.TemporaryFile() as f:
+        f.write(b"\x01\x02\x00\x00\x00rest")
+        f.seek(0)
+        raw = io.FileIO(f.fileno(), closefd=False)
+        p = A.unpack(raw, read_ahead=1024)
+        assert (p.x, p.y) == (1, 2)
+        assert raw.tell() == 5
+        assert raw.read() == b"rest"
+
+    # fixed size records are read one record at a time, there is nothing to rewind
+    raw = CountingRaw(b"\x01\x02\x00\x00\x00" * 3 + b"tail", seekable=True)
+    for i in range(3):
+        assert A.unpack(raw).y == 2 and raw.tell() == 5 * (i + 1)
+    assert raw.calls == 3 and raw.read() == b"tail"
+
+def test_projection():
+    class A(Struct):
+        def name_size(self) -> list[Any]:
+            return [self.size, "cstring"]
+
+        kind: Tag[int, "u8"]
+        pad: Tag[list[int], 2, "[]", DV[lambda v: 1 / 0], "u16"] # type: ignore
+        size: Tag[int, "u8"]
+        name: Tag[bytes, DTR[name_size]]
+        flag: Tag[int, "u8"]
+        ts: Tag[int, LittleEndian, "u32"]
+        tail: Tag[bytes, "cstring"]
+
+    inp = b"\x07\x00\x01\x00\x02\x03abc\x01\x10\x00\x00\x00xyz\x00"
+    p = A.unpack_b(inp, fields={"ts", "kind"})
+    assert (p.kind, p.ts) == (7, 0x10)
+    assert p.size == 3 # read by name_size
+    assert not hasattr(p, "name") and not hasattr(p, "pad") and not hasattr(p, "tail")
+
+    stream = io.BytesIO(inp + b"next")
+    p = A.unpack(stream, fields=["ts"])
+    assert p.ts == 0x10
+    assert stream.read() == b"next"
+
+    assert A._projection({"kind", "ts"}) is A._projection(["ts", "kind"])
+    assert A._projection({"ts"}).fields == {"ts", "size"}
+    with pytest.raises(ValueError):
+        A.unpack_b(inp, fields={"missing"})
+
+def test_projection_nested_skip():
+    class Inner(Struct):
+        def arr(self) -> list[Any]:
+            return [self.n, "[]", "u8"]
+
+        n: Tag[int, "u8"]
+        data: Tag[list[int], DTR[arr]]
+
+    class A(Struct):
+        inner: Tag[Inner, Inner]
+        x: Tag[int, "u16"]
+
+    inp = b"\x03\x01\x02\x03\xAB\xCD"
+    assert A.unpack_b(inp, fields={"x"}).x == 0xABCD
+    assert A.unpack(io.BytesIO(inp), fields={"x"}).x == 0xABCD
+
+    # fields read through helper methods aren't known: all earlier fields are decoded
+    class B(Struct):
+        def count(self) -> int:
+            return self.n
+
+        def arr(self) -> list[Any]:
+            return [self.count(), "[]", "u8"]
+
+        n: Tag[int, "u8"]
+        pad: Tag[int, "u8"]
+        data: Tag[list[int], DTR[arr]]
+
+    assert B.unpack_b(b"\x02\x00\x05\x06", fields={"data"}).data == [5, 6]
+
+    # and so are those read through other callables or computed names
+    import operator
+    get_n = operator.attrgetter("n")
+    field = "n"
+
+    class C(Struct):
+        n: Tag[int, "u8"]
+        pad: Tag[int, "u8"]
+        data: Tag[list[int], DTR[lambda self: [get_n(self), "[]", "u8"]]]
+        more: Tag[list[int], DTR[lambda self: [getattr(self, field), "[]", "u8"]]]
+
+    c = C.unpack_b(b"\x02\x00\x05\x06\x07\x08", fields={"data", "more"})
+    assert (c.data, c.more) == ([5, 6], [7, 8])
+
+def test_iter_unpack_where():
+    calls: list[int] = []
+
+    def count(v: int) -> int:
+        calls.append(v)
+        return v
+
+    class A(Struct):
+        kind: Tag[int, "u8"]
+        ts: Tag[int, "u16"]
+        value: Tag[int, DV[count], "u16"] # type: ignore
+        name: Tag[bytes, "cstring"]
+
+    records = [(7, 10, b"a"), (1, 20, b"bb"), (7, 30, b"ccc"), (7, 5, b"")]
+    inp = b"".join(bytes([k]) + ts.to_bytes(2, "big") + b"\x00\x01" + n + b"\x00" for k, ts, n in records)
+
+    T = 8
+    scan = A.iter_unpack(io.BytesIO(inp), where=lambda r: r.kind == 7 and r.ts > T)
+    assert [(r.ts, r.name) for r in scan] == [(10, b"a"), (30, b"ccc")]
+    assert (scan.scanned, scan.matched) == (4, 2)
+    assert len(calls) == 2
+
+    scan = A.iter_unpack_b(inp, where=lambda r: r.kind == 1, fields={"name"})
+    assert [r.name for r in scan] == [b"bb"]
+    assert (scan.scanned, scan.matched) == (4, 1)
+    assert A.unpack_b(inp).name == b"a"
+
+    assert [r.ts for r in A.iter_unpack(CountingRaw(inp, seekable=False))] == [10, 20, 30, 5]
+
+    # predicates reading the record through its methods and properties
+    class B(A):
+        def interesting(self) -> bool:
+            return self.ts > 15
+
+        @property
+        def named(self) -> bool:
+            return bool(self.name)
+
+    assert [r.ts for r in B.iter_unpack(io.BytesIO(inp), where=lambda r: r.interesting())] == [20, 30]
+    assert [r.ts for r in B.iter_unpack_b(inp, where=lambda r: r.named, fields={"ts"})] == [10, 20, 30]
+
+def test_checksum():
+    class Frame(Struct):
+        sync: Tag[int, "u8"]
+        length: Tag[int, "u8"]
+        payload: Tag[bytes, "cstring"]
+        crc: Tag[int, Checksum["crc32"], LittleEndian, "u32"] # type: ignore
+
+    body = b"\xAA\x05hello\x00"
+    frame = body + zlib.crc32(body).to_bytes(4, "little")
+    assert Frame.unpack_b(frame).payload == b"hello"
+    assert Frame.unpack(io.BytesIO(frame)).crc == zlib.crc32(body)
+    assert [f.payload for f in Frame.iter_unpack(io.BytesIO(frame * 2))] == [b"hello"] * 2
+
+    corrupt = body.replace(b"h", b"j") + frame[-4:]
+    with pytest.raises(ChecksumError):
+        Frame.unpack_b(corrupt)
+    with pytest.raises(ChecksumError):
+        Frame.unpack(io.BytesIO(corrupt))
+    # projected and filtered records are verified too
+    assert Frame.unpack_b(frame, fields=["sync"]).sync == 0xAA
+    with pytest.raises(ChecksumError):
+        Frame.unpack_b(corrupt, fields=["sync"])
+    with pytest.raises(ChecksumError):
+        Frame.unpack(io.BytesIO(corrupt), fields=["sync"])
+    with pytest.raises(ChecksumError):
+        list(Frame.iter_unpack(io.BytesIO(frame + corrupt), where=lambda f: f.sync == 0xAA))
+    with pytest.raises(ChecksumError):
+        list(Frame.iter_unpack_b(frame + corrupt, where=lambda f: f.sync == 0xAA, reuse=True))
+    assert [f.length for f in Frame.iter_unpack_b(frame * 2, where=lambda f: f.length == 5)] == [5, 5]
+    with pytest.raises(ValueError):
+        Frame.unpack_b(frame, fields=["missing"])
+
+    class Other(Struct):
+        sync: Tag[int, "u8"]
+        data: Tag[bytes, 9, "cstring"]
+        crc: Tag[int, Checksum["crc16", 1:], "u16"] # type: ignore
+        total: Tag[int, Checksum["sum8", 1:4, False], "u8"] # type: ignore
+
+    inp = b"\x7E123456789\x29\xB1\x96"
+    p = Other.unpack_b(inp)
+    assert p.crc == 0x29B1 and p.checksum_valid
+    p = Other.unpack(io.BytesIO(inp[:-1] + b"\x00"))
+    assert not p.checksum_valid
+
+    async def main():
+        async with aiofiles.tempfile.TemporaryFile() as f: # type: ignore
+            await f.write(frame) # type: ignore
+            await f.seek(0) # type: ignore
+            p = await Frame.unpack_async(f) # type: ignore
+            assert p.payload == b"hello" # type: ignore
+    asyncio.run(main())
+
+    # streams are read through the checksums with readexactly and peek too, peeked bytes count once
+    from struc2 import Frame as Framed
+
+    class Body(Struct):
+        data: Tag[list[int], "rest[]", "u8"]
+
+    class Packet(Struct):
+        count: Tag[int, "varint"]
+        size: Tag[int, "u8"]
+        body: Tag[Body, Framed["size"], Body]
+        crc: Tag[int, Checksum["crc32"], LittleEndian, "u32"] # type: ignore
+
+    packed = b"\x96\x01\x03\x01\x02\x03"
+    packed += zlib.crc32(packed).to_bytes(4, "little")
+    p = Packet.unpack(io.BufferedReader(io.BytesIO(packed))) # type: ignore
+    assert (p.count, p.body.data) == (150, [1, 2, 3])
+
+    async def framed():
+        reader = asyncio.StreamReader()
+        reader.feed_data(packed)
+        reader.feed_eof()
+        p = await Packet.unpack_async(reader)
+        assert p.body.data == [1, 2, 3]
+        reader = asyncio.StreamReader()
+        reader.feed_data(packed[:-1] + b"\x00")
+        reader.feed_eof()
+        with pytest.raises(ChecksumError):
+            await Packet.unpack_async(reader)
+    asyncio.run(framed())
+
+def test_iter_unpack_compressed():
+    import bz2
+    import gzip
+    import lzma
+
+    class A(Struct):
+        n: Tag[int, "u16"]
+        name: Tag[bytes, "cstring"]
+
+    records = [(i, b"x" * (i % 13)) for i in range(500)]
+    raw = b"".join(n.to_bytes(2, "big") + name + b"\x00" for n, name in records)
+    archives = {
+        "gzip": gzip.compress(raw[:1000]) + gzip.compress(raw[1000:]),
+        "zlib": zlib.compress(raw),
+        "bz2": bz2.compress(raw),
+        "lzma": lzma.compress(raw),
+    }
+    for codec, data in archives.items():
+        scan = A.iter_unpack_compressed(io.BytesIO(data), codec, block_size=7)
+        assert [(r.n, r.name) for r in scan] == records
+        assert scan.scanned == 500
+        # a stream cut before its trailer fails rather than ending early
+        with pytest.raises(struct.error, match="end-of-stream"):
+            list(A.iter_unpack_compressed(io.BytesIO(data[:-4]), codec, block_size=7))
+    assert list(A.iter_unpack_compressed(io.BytesIO(b""), "gzip")) == []
+
+    with tempfile.TemporaryDirectory() as d:
+        path = f"{d}/records.gz"
+        with open(path, "wb") as f:
+            f.write(archives["gzip"])
+        scan = A.iter_unpack_compressed(path, where=lambda r: r.n % 100 == 0)
+        assert [r.n for r in scan] == [0, 100, 200, 300, 400]
+
+    with pytest.raises(struct.error):
+        list(A.iter_unpack_compressed(io.BytesIO(zlib.compress(raw[:-3])), "zlib"))
+
+    # corrupt records fail where they are, cut ones are buffered up to max_record bytes
+    from struc2 import Limits, LimitExceeded
+
+    class V(Struct):
+        n: Tag[int, "varint"]
+
+    corrupt = zlib.compress(b"\x01" + b"\xff" * 100_000)
+    with pytest.raises(struct.error, match="varint longer"):
+        list(V.iter_unpack_compressed(io.BytesIO(corrupt), "zlib", block_size=64))
+
+    class Bounded(A):
+        _limits = Limits(max_record=1000)
+
+    unterminated = zlib.compress(b"\x00\x01a\x00\x00\x02" + b"b" * 100_000)
+    with pytest.raises(LimitExceeded):
+        list(Bounded.iter_unpack_compressed(io.BytesIO(unterminated), "zlib", block_size=64))
+
+def test_unpack_into_and_reuse():
+    class Point(Struct):
+        x: Tag[int, "u8"]
+
+    class A(Struct):
+        n: Tag[int, "u8"]
+        values: Tag[list[int], 2, "[]", "u16"]
+        points: Tag[list[Point], 2, "[]", Point]
+
+    inp = b"\x01\x00\x02\x00\x03\x04\x05" + b"\x02\x00\x06\x00\x07\x08\x09"
+    a = A.unpack_b(inp)
+    values, point = a.values, a.points[0]
+    assert A.unpack_into(a, inp[7:]) is a
+    assert (a.n, a.values, a.points[1].x) == (2, [6, 7], 9)
+    assert a.values is values and a.points[0] is point
+    A.unpack_into(a, io.BytesIO(inp))
+    assert (a.n, a.values, a.points[0].x) == (1, [2, 3], 4)
+
+    seen = [(r, r.n, list(r.values)) for r in A.iter_unpack_b(inp, reuse=True)]
+    assert seen[0][0] is seen[1][0]
+    assert [s[1:] for s in seen] == [(1, [2, 3]), (2, [6, 7])]
+    records = list(A.iter_unpack(io.BytesIO(inp), reuse=True))
+    assert records[0] is records[1] and records[0].n == 2
+    records = list(A.iter_unpack(io.BytesIO(inp), where=lambda r: r.n > 0, reuse=True))
+    assert records[0] is records[1]
+
+def test_zero_copy():
+    class Packet(Struct):
+        name: Tag[bytes, "cstring"]
+        tag: Tag[bytes, 3, "bytes"]
+        payload: Tag[list[bytes], 2, "[]", "char"]
+
+    data = b"ab\0xyz\x01\x02"
+    p = Packet.unpack_b(data)
+    assert (p.name, p.tag, p.payload) == (b"ab", b"xyz", [b"\x01", b"\x02"])
+
+    p = Packet.unpack_b(data, zero_copy=True)
+    assert all(isinstance(v, memoryview) and v.obj is data for v in (p.name, p.tag, p.payload))
+    assert (bytes(p.name), bytes(p.tag), bytes(p.payload)) == (b"ab", b"xyz", b"\x01\x02")
+
+    records = list(Packet.iter_unpack_b(data * 2, zero_copy=True))
+    assert [bytes(r.tag) for r in records] == [b"xyz", b"xyz"]
+    assert type(Packet.unpack_b(data).tag) is bytes
+
+def test_aiter_unpack():
+    class Pair(Struct):
+        a: Tag[int, "u8"]
+        b: Tag[int, "u16"]
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"\x01\x00\x02" * 5 + b"\x02")
+        batches = Pair.aiter_unpack(reader, max_batch=3)
+        assert [p.a for p in await batches.__anext__()] == [1, 1, 1]
+        assert len(await batches.__anext__()) == 2
+        reader.feed_data(b"\x00\x03")
+        reader.feed_eof()
+        assert [(p.a, p.b) for p in await batches.__anext__()] == [(2, 3)]
+        assert [b async for b in batches] == []
+
+        class V(Struct):
+            n: Tag[int, "varint"]
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"\x01" + b"\xff" * 20)
+        with pytest.raises(struct.error, match="varint longer"):
+            await V.aiter_unpack(reader).__anext__()
+
+        # the latency deadline passing is scripted by the reader rather than waited for
+        class Scripted:
+            def __init__(self, *steps: Optional[bytes]):
+                self.steps = list(steps)
+
+            async def read(self, n: int = -1) -> bytes:
+                step = self.steps.pop(0)
+                if step is None:
+                    raise asyncio.TimeoutError
+                return step
+
+        reader = Scripted(b"\x01\x00\x02", b"\x01\x00\x02", None, b"\x02\x00\x03", b"")
+        batches = Pair.aiter_unpack(reader, max_latency=3600) # type: ignore
+        assert [[p.a for p in b] async for b in batches] == [[1, 1], [2]]
+
+        reader = Scripted(b"\x01\x00\x02", b"\x01\x00\x02", None, b"")
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=1)
+        task = asyncio.create_task(Pair.unpack_to_queue(reader, queue, max_latency=3600)) # type: ignore
+        assert len(await queue.get()) == 2
+        assert await queue.get() is None
+        assert await task == 2
+
+    asyncio.run(main())
+
+def test_bits():
+    class Status(Struct):
+        flags: Tag[Any, {"armed": 1, "mode": 3, "_reserved": 4, "level": 8}, "bits", LittleEndian, "u16"]
+        name: Tag[bytes, "cstring"]
+
+    s = Status.unpack_b(b"\x0b\x7f" + b"ok\0")
+    assert (s.flags.armed, s.flags.mode, s.flags.level) == (True, 5, 0x7f)
+    assert s.flags._fields == ("armed", "mode", "level")
+    assert s.pack() == b"\x0b\x7f" + b"ok\0"
+
+    bits = s.flags
+    s.flags = {"armed": False, "mode": 7, "level": 1}
+    assert s.pack() == b"\x0e\x01" + b"ok\0"
+    s.flags = bits._replace(mode=8)
+    with pytest.raises(struct.error):
+        s.pack()
+
+def test_varint():
+    class Sample(Struct):
+        id: Tag[int, "varint"]
+        delta: Tag[int, "svarint"]
+        big: Tag[int, "uleb128"]
+        values: Tag[list[int], 3, "[]", "varint"]
+
+    data = b"\x96\x01" + b"\x03" + b"\x80" * 10 + b"\x01" + b"\x01\xac\x02\x7f"
+    s = Sample.unpack_b(data)
+    assert (s.id, s.delta, s.big, s.values) == (150, -2, 1 << 70, [1, 300, 127])
+    assert s.pack() == data
+    s = Sample.unpack(io.BufferedReader(CountingRaw(data, False)))
+    assert (s.id, s.delta, s.big, s.values) == (150, -2, 1 << 70, [1, 300, 127])
+    s = Sample.unpack(io.BytesIO(data))
+    assert s.values == [1, 300, 127]
+
+    with pytest.raises(struct.error):
+        Sample.unpack_b(b"\xff" * 11)
+
+def test_delta_and_rle_arrays():
+    class Series(Struct):
+        timestamps: Tag[list[int], 4, "delta[]", LittleEndian, "u16"]
+        flags: Tag[list[int], 3, "rle[]", "u8"]
+        offsets: Tag[list[int], 3, "delta[]", "svarint"]
+
+    data = b"\xe8\x03\x0a\x00\x0a\x00\x14\x00" + b"\x02\x01\x00\x00\x03\x05" + b"\x14\x03\x03"
+    s = Series.unpack_b(data)
+    assert s.timestamps == [1000, 1010, 1020, 1040]
+    assert s.flags == [1, 1, 5, 5, 5]
+    assert s.offsets == [10, 8, 6]
+    with pytest.raises(struct.error):
+        s.pack() # the empty run isn't reproduced
+    s.flags = [1, 2, 2, 3]
+    assert s.pack() == data[:8] + b"\x01\x01\x02\x02\x01\x03" + data[-3:]
+    assert Series.unpack(io.BytesIO(data)).timestamps == s.timestamps
+
+    class Long(Struct):
+        values: Tag[list[int], 100, "delta[]", "u16"]
+        runs: Tag[list[int], 50, "rle[]", "u8"]
+
+    raw = struct.pack(">100H", *[3] * 100) + bytes([2, 7] * 50)
+    long = Long.unpack_b(raw)
+    assert long.values == list(range(3, 303, 3))
+    assert long.runs == [7] * 100
+
+def test_encoded_arrays_numpy_matches_python(monkeypatch: Any):
+    pytest.importorskip("numpy")
+    from struc2 import Accel
+
+    class Wide(Struct):
+        big: Tag[list[int], 64, "delta[]", "u64"]
+        small: Tag[list[int], 64, "delta[]", "i8"]
+        runs: Tag[list[int], 32, "rle[]", "i8"]
+
+    data = struct.pack(">64Q", *[1 << 62] * 64) + struct.pack(">64b", *[-100] * 64) + bytes([3, 1] * 32)
+    with_numpy = vars(Wide.unpack_b(data))
+    assert with_numpy["big"][-1] == 64 << 62 and with_numpy["small"][-1] == -6400
+    negative = data[:-2] + b"\xff\x01"
+    with pytest.raises(struct.error):
+        Wide.unpack_b(negative)
+    monkeypatch.setattr(Accel, "numpy", lambda: None)
+    assert vars(Wide.unpack_b(data)) == with_numpy
+    with pytest.raises(struct.error):
+        Wide.unpack_b(negative)
+
+def test_resync():
+    class Frame(Struct):
+        sync: Tag[bytes, b"\xaa\x55", "magic"]
+        length: Tag[int, "u8"]
+        payload: Tag[list[int], 2, "[]", "u8"]
+        crc: Tag[int, Checksum[("sum8", slice(2, None))], "u8"]
+
+    good = b"\xaa\x55\x02\x01\x02\x05"
+    bad = b"\xaa\x55\x02\x01\x02\x06"
+    data = b"\x00\xaa" + bad + b"\x55" + good + good
+
+    record, skipped, size = Frame.resync(data)
+    assert record is not None and record.payload == [1, 2]
+    assert (skipped, size) == (9, 6)
+    assert Frame.resync(data, valid=lambda f: f.length > 2) == (None, 20, 0)
+    assert Frame.resync(data[:12]) == (None, 9, 0)
+
+    stream = io.BytesIO(data)
+    record, skipped, size = Frame.resync(stream, window=4)
+    assert record is not None and (skipped, size) == (9, 6)
+    assert Frame.unpack(stream).crc == 5
+    with pytest.raises(ValueError):
+        Frame.unpack_b(bad[1:] + b"\0")
+
+    # corrupt candidates are dropped, only cut ones are kept for more bytes
+    class Counted(Struct):
+        sync: Tag[bytes, b"\xaa\x55", "magic"]
+        count: Tag[int, "varint"]
+
+    assert Counted.resync(b"\xaa\x55" + b"\xff" * 20 + b"\x00" * 100) == (None, 121, 0)
+    assert Counted.resync(b"\x00\xaa\x55\xff") == (None, 1, 0)
+
+    # Frame lengths are checked against the buffer and max_record before decoding
+    from struc2 import Frame as Framed, Limits
+
+    class Body(Struct):
+        data: Tag[list[int], "rest[]", "u8"]
+
+    class Packet(Struct):
+        sync: Tag[bytes, b"\xaa\x55", "magic"]
+        size: Tag[int, "u16"]
+        body: Tag[Body, Framed["size"], Body]
+
+    class Bounded(Packet):
+        _limits = Limits(max_record=64)
+
+    huge = b"\xaa\x55\xff\xff" + b"\x00" * 10
+    assert Packet.resync(huge) == (None, 0, 0)
+    assert Bounded.resync(huge) == (None, 13, 0)
+    record, skipped, size = Bounded.resync(huge + b"\xaa\x55\x00\x02\x01\x02")
+    assert record is not None and record.body.data == [1, 2] and (skipped, size) == (14, 6)
+
+def test_as_ctypes():
+    class Point(Struct):
+        x: Tag[int, LittleEndian, "i16"]
+        y: Tag[int, LittleEndian, "i16"]
+
+    class Packed(Struct):
+        kind: Tag[int, "u8"]
+        value: Tag[float, LittleEndian, "f64"]
+        name: Tag[bytes, 3, "cstring"]
+        points: Tag[list[int], 2, "[]", LittleEndian, "u32"]
+
+    class Native(Packed):
+        _layout = "@"
+        origin: Tag[Point, Point]
+
+    data = bytearray(b"\x07" + struct.pack("<d", 1.5) + b"abc" + struct.pack("<2I", 1, 2))
+    view = Packed.as_ctypes().from_buffer(data)
+    p = Packed.unpack_b(data)
+    assert (view.kind, view.value, view.name, list(view.points)) == (p.kind, p.value, p.name, p.points)
+
+    native = struct.pack("@Bd3s2Ihh", 7, 1.5, b"abc", 1, 2, -1, 3)
+    n = Native.unpack_b(native)
+    view = Native.as_ctypes().from_buffer_copy(native)
+    assert Native()._size() == len(native) == ctypes.sizeof(view)
+    assert (view.kind, view.value, view.name, list(view.points)) == (n.kind, n.value, n.name, n.points)
+    assert (view.origin.x, view.origin.y) == (n.origin.x, n.origin.y) == (-1, 3)
+    assert n.pack() == native
+
+def test_ring():
+    class Sample(Struct):
+        seq: Tag[int, "u32"]
+        name: Tag[bytes, "cstring"]
+
+    def sample(seq: int, name: bytes) -> Sample:
+        s = Sample()
+        s.seq, s.name = seq, name
+        return s
+
+    with Ring(Sample, capacity=64) as producer:
+        consumer = Ring.attach(Sample, producer.name)
+        pushed = producer.push_many([sample(i, b"x" * i) for i in range(10)])
+        assert pushed == 5
+        assert [s.seq for s in consumer.pop_many(3)] == [0, 1, 2]
+        assert producer.push(sample(5, b"wrap")) # frame wraps to the start
+        assert [(s.seq, s.name) for s in consumer.pop_many()] == [(3, b"xxx"), (4, b"xxxx"), (5, b"wrap")]
+        assert consumer.pop() is None and len(consumer) == 0
+        consumer.close()
+
+def test_ring_wrap_when_empty():
+    class Blob(Struct):
+        data: Tag[bytes, "cstring"]
+
+    def blob(size: int) -> Blob:
+        b = Blob()
+        b.data = b"x" * (size - 1)
+        return b
+
+    with Ring(Blob, capacity=100) as ring:
+        assert ring.push(blob(30)) and len(ring.pop_many()) == 1
+        # 34 bytes in, an 84 byte frame doesn't fit before the end but the ring is empty
+        assert ring.push(blob(80))
+        assert [len(b.data) for b in ring.pop_many()] == [79]
+        assert ring.push(blob(10))
+        # 98 bytes in with a frame at 84 unread: wrapping can only use the 84 bytes before it
+        assert not ring.push(blob(81))
+        assert ring.push(blob(80))
+        assert [len(b.data) for b in ring.pop_many()] == [9, 79]
+
+def ring_producer(name: str, count: int):
+    ring = Ring.attach(RingSample, name)
+    records = [RingSample(seq=i, value=i / 2, name=b"sensor%d" % i) for i in range(count)]
+    while records:
+        records = records[ring.push_many(records):]
+    ring.close()
+
+def test_ring_processes():
+    # a spawned producer filling a small ring many times over while this process consumes
+    count = 2000
+    with Ring(RingSample, capacity=256) as consumer:
+        producer = multiprocessing.get_context("spawn").Process(target=ring_producer, args=(consumer.name, count))
+        producer.start()
+        try:
+            received = list[RingSample]()
+            while len(received) < count and (producer.is_alive() or len(consumer)):
+                received += consumer.pop_many()
+        finally:
+            producer.join(timeout=30)
+        assert producer.exitcode == 0
+        assert [(r.seq, r.value, r.name) for r in received] == [(i, i / 2, b"sensor%d" % i) for i in range(count)]
+
+IMPORT_BUDGET_US = 150_000
+
+def test_import_time():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # legacy struc runs on struc2 and imports it whole
+    for package in ("struc2", "struc"):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {package}"], cwd=root, capture_output=True, text=True, check=True
+        ).stderr
+        times = {line.split("|")[2].strip(): int(line.split("|")[1]) for line in out.splitlines()[1:]}
+        for lazy in ("asyncio", "numpy", "ctypes", "multiprocessing"):
+            assert lazy not in times, f"{lazy} imported eagerly by {package}"
+        assert times[package] < IMPORT_BUDGET_US
+
+def test_chunked_array():
+    from struc2.Chunked import ChunkedArray
+
+    class Samples(Struct):
+        n: Tag[int, "u32"]
+        values: Tag[ChunkedArray[int], 10, 4, "chunked[]", "u16"]
+        tail: Tag[int, "u8"]
+
+    def record(start: int, tail: int) -> bytes:
+        return struct.pack(">I10HB", 10, *range(start, start + 10), tail)
+
+    s = Samples.unpack(io.BytesIO(record(0, 7)))
+    assert len(s.values) == 10 and not hasattr(s, "tail")
+    assert [c for c in s.values.chunks()] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert s.tail == 7
+
+    s = Samples.unpack(io.BytesIO(record(0, 7)))
+    assert next(s.values.arrays()).tolist() == [0, 1, 2, 3]
+    assert s.values.skip() == 6 and s.tail == 7
+
+    assert Samples.unpack_b(record(5, 9)).pack() == record(5, 9)
+    s = Samples.unpack_b(record(5, 9))
+    assert s.tail == 9 and list(s.values.elements()) == list(range(5, 15))
+
+    data = record(0, 4) + record(10, 8)
+    # records left unread are finished before the next one is decoded
+    assert [r.tail for r in list(Samples.iter_unpack(io.BytesIO(data)))] == [4, 8]
+    assert [next(r.values.chunks()) for r in Samples.iter_unpack(io.BytesIO(data))] == [[0, 1, 2, 3], [10, 11, 12, 13]]
+    with pytest.raises(ValueError):
+        list(Samples.iter_unpack(io.BytesIO(data), fields=["n"]))
+
+    # the decompression buffer is reused, arrays keep a copy of their bytes
+    records = list(Samples.iter_unpack_compressed(io.BytesIO(zlib.compress(data)), "zlib", block_size=5))
+    assert [(list(r.values.elements()), r.tail) for r in records] == [(list(range(10)), 4), (list(range(10, 20)), 8)]
+
+    class Outer(Struct):
+        samples: Tag[Samples, Samples]
+        t: Tag[int, "u8"]
+
+    assert Outer.unpack_b(record(0, 4) + b"\x09").t == 9
+    with pytest.raises(ValueError):
+        Outer.unpack(io.BytesIO(record(0, 4) + b"\x09"))
+
+
+def test_pack_many():
+    class Point(Struct):
+        magic: Tag[bytes, b"PT", "magic"]
+        x: Tag[int, "u16"]
+        y: Tag[float, LittleEndian, "f32"]
+        rgb: Tag[list[int], 3, "[]", "u8"]
+
+    xs, ys, rgbs = [1, 2, 300], [0.5, -1.0, 2.25], [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    packed = Point.pack_many({"x": xs, "y": ys, "rgb": rgbs})
+    expected = b""
+    for x, y, rgb in zip(xs, ys, rgbs):
+        p = Point()
+        p.magic, p.x, p.y, p.rgb = b"PT", x, y, rgb
+        expected += p.pack()
+    assert bytes(packed) == expected
+
+    out = bytearray(len(expected) + 4)
+    assert Point.pack_many({"x": xs, "y": ys, "rgb": rgbs}, out) is out
+    assert out[:len(expected)] == expected
+    with pytest.raises(ValueError):
+        Point.pack_many({"x": xs, "y": ys[:2], "rgb": rgbs})
+    with pytest.raises(ValueError):
+        Point.pack_many({"x": xs, "y": ys})
+    with pytest.raises(ValueError):
+        Point.pack_many({"x": xs, "y": ys, "rgb": rgbs}, bytearray(4))
+
+    class Aligned(Struct):
+        _layout = "@"
+        a: Tag[int, LittleEndian, "u8"]
+        b: Tag[int, LittleEndian, "u32"]
+
+    packed = Aligned.pack_many({"a": [1, 2], "b": [3, 4]})
+    assert bytes(packed) == struct.pack("<B3xIB3xI", 1, 3, 2, 4)
+
+def test_pack_many_numpy_columns():
+    np = pytest.importorskip("numpy")
+
+    class Sample(Struct):
+        a: Tag[int, "u16"]
+        f: Tag[float, "f32"]
+        rgb: Tag[list[int], 3, "[]", "u8"]
+
+    for n in (3, 64):
+        rgb = np.zeros((n, 3), dtype=np.int64)
+        packed = Sample.pack_many({"a": np.arange(n), "f": np.ones(n), "rgb": rgb})
+        assert bytes(packed) == Sample.pack_many({"a": list(range(n)), "f": [1.0] * n, "rgb": rgb.tolist()})
+        with pytest.raises(struct.error):
+            Sample.pack_many({"a": np.arange(70000, 70000 + n), "f": np.ones(n), "rgb": rgb})
+        with pytest.raises(struct.error):
+            Sample.pack_many({"a": [1.7] * n, "f": np.ones(n), "rgb": rgb})
+        with pytest.raises(struct.error):
+            Sample.pack_many({"a": np.arange(n), "f": np.ones(n), "rgb": rgb + 256})
+
+def test_vectorized_dv():
+    from struc2 import VDV, Affine
+    calls = []
+
+    def calibrate(values: list[int]) -> list[float]:
+        calls.append(len(values))
+        return [v / 4 for v in values]
+
+    class Samples(Struct):
+        raw: Tag[list[float], 4, "[]", VDV[calibrate], "u16"]
+        volts: Tag[list[float], 3, "[]", Affine[0.5, -1.0], LittleEndian, "u16"]
+        temp: Tag[float, Affine[0.25], "i8"]
+
+    data = struct.pack(">4H", 4, 8, 12, 16) + struct.pack("<3H", 2, 4, 6) + struct.pack("b", -8)
+    s = Samples.unpack_b(data)
+    assert s.raw == [1.0, 2.0, 3.0, 4.0] and calls == [4]
+    assert s.volts == [0.0, 1.0, 2.0]
+    assert s.temp == -2.0
+    assert Samples.unpack(io.BytesIO(data)).volts == [0.0, 1.0, 2.0] and calls == [4, 4]
+
+    class Packed(Struct):
+        volts: Tag[list[float], 3, "[]", Affine[0.5, -1.0], LittleEndian, "u16"]
+        temp: Tag[float, Affine[0.25], "i8"]
+
+    p = Packed()
+    p.volts, p.temp = [0.0, 1.0, 2.0], -2.0
+    assert p.pack() == struct.pack("<3Hb", 2, 4, 6, -8)
+
+def test_vectorized_dv_whole_arrays():
+    from struc2 import VDV
+
+    def center(values: list[int]) -> list[float]:
+        mean = sum(values) / len(values)
+        return [v - mean for v in values]
+
+    class Centered(Struct):
+        values: Tag[list[float], 3, "[]", VDV[center], "u8"]
+
+    data = b"\x01\x02\x03"
+
+    async def from_reader() -> Any:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await Centered.unpack_async(reader)
+
+    class Names(Struct):
+        names: Tag[list[bytes], 2, "[]", VDV[lambda v: sorted(v)], "cstring"]
+
+    for c in (Centered.unpack_b(data), asyncio.run(from_reader()), Centered.unpack_into(Centered(), io.BytesIO(data))):
+        assert c.values == [-1.0, 0.0, 1.0]
+    assert Names.unpack(io.BytesIO(b"b\0a\0")).names == [b"a", b"b"]
+    assert Names.unpack_into(Names.unpack_b(b"b\0a\0"), b"d\0c\0").names == [b"c", b"d"]
+
+    class Single(Struct):
+        x: Tag[float, VDV[center], "u8"]
+
+    with pytest.raises(TypeError):
+        Single.unpack_b(b"\x01")
+
+
+def test_affine_numpy_matches_python(monkeypatch: Any):
+    pytest.importorskip("numpy")
+    from struc2 import Affine, Accel
+
+    class Scaled(Struct):
+        big: Tag[list[int], 64, "[]", Affine[1000], "u16"]
+        wide: Tag[list[int], 64, "[]", Affine[1 << 40], "u64"]
+        volts: Tag[list[float], 64, "[]", Affine[0.01, -40.0], "i16"]
+
+    data = struct.pack(">64H", *[60000] * 64) + struct.pack(">64Q", *range(64)) + struct.pack(">64h", *range(-32, 32))
+    with_numpy = vars(Scaled.unpack_b(data))
+    assert with_numpy["big"] == [60_000_000] * 64
+    monkeypatch.setattr(Accel, "numpy", lambda: None)
+    assert vars(Scaled.unpack_b(data)) == with_numpy
+
+def test_decode_cache():
+    class Status(Struct):
+        _decode_cache = 2
+        device: Tag[int, "u16"]
+        levels: Tag[list[int], 2, "[]", "u8"]
+
+    a, b, c = b"\x00\x01\x05\x06", b"\x00\x02\x07\x08", b"\x00\x03\x09\x0a"
+    first = Status.unpack_b(a + b"trailing")
+    again = Status.unpack_b(a)
+    assert again is not first and (again.device, again.levels) == (1, [5, 6])
+    again.device = 9
+    again.levels.append(7)
+    fresh = Status.unpack_b(a)
+    assert (fresh.device, fresh.levels) == (1, [5, 6])
+    cache = Status.decode_cache()
+    assert (cache.hits, cache.misses) == (2, 1) and cache.hit_rate == 2 / 3
+
+    Status.unpack_b(b)
+    Status.unpack_b(c) # evicts `a`, used least recently
+    assert len(cache) == 2
+    Status.unpack_b(a)
+    assert cache.misses == 4
+    assert Status.unpack_b(a, cache=False).device == 1 and cache.hits == 2
+
+    class Impure(Struct):
+        _decode_cache = False
+        x: Tag[int, "u8"]
+
+    Impure.unpack_b(b"\x01", cache=True)
+    Impure.unpack_b(b"\x01", cache=True)
+    assert len(Impure.decode_cache()) == 0
+
+    class Reading(Struct):
+        _decode_cache = True
+        status: Tag[Status, Status]
+        history: Tag[list[Status], 2, "[]", Status]
+
+    r = Reading.unpack_b(a * 3)
+    r.status.levels[0] = 0
+    r.history[1].device = 0
+    r = Reading.unpack_b(a * 3)
+    assert (r.status.levels, r.history[1].device) == ([5, 6], 1)
+
+    class Plain(Struct):
+        x: Tag[int, "u8"]
+
+    Plain.unpack_b(b"\x01")
+    Plain.unpack_b(b"\x01", cache=True)
+    Plain.unpack_b(b"\x01", cache=True)
+    assert Plain.decode_cache().hits == 1
+
+def test_intern():
+    from struc2 import Intern, InternTable
+    table = InternTable(maxsize=3)
+
+    class Event(Struct):
+        device: Tag[str, Intern[table, "ascii"], "cstring"]
+        unit: Tag[bytes, Intern[table], 2, "bytes"]
+        code: Tag[str, Intern["utf-8"], "cstring"]
+
+    data = b"pump-1\0mAok\0" * 3 + b"pump-2\0mVok\0"
+    events = list(Event.iter_unpack(io.BytesIO(data)))
+    assert [(e.device, e.unit, e.code) for e in events[2:]] == [("pump-1", b"mA", "ok"), ("pump-2", b"mV", "ok")]
+    assert events[0].device is events[1].device and events[0].unit is events[2].unit
+    assert events[0].code is events[3].code
+    # the table is full after 3 values, `mV` isn't kept
+    assert len(table) == 3 and (table.hits, table.misses) == (4, 4) and table.hit_rate == 0.5
+    assert Event.unpack_b(b"pump-2\0mVok\0").unit is not events[3].unit
+
+    assert events[3].pack() == b"pump-2\0mVok\0"
+    table.clear()
+    assert len(table) == 0 and table.hits == 0
+
+def test_limits():
+    from struc2 import Limits, LimitExceeded
+
+    class Frame(Struct):
+        def payload_tags(self) -> list[Any]:
+            return [self.count, "[]", "u8"]
+
+        count: Tag[int, "u32"]
+        payload: Tag[list[int], DTR[payload_tags]]
+        name: Tag[bytes, "cstring"]
+
+    corrupt = b"\xff\xff\xff\xff" + bytes(16)
+    with pytest.raises(LimitExceeded) as e:
+        Frame.unpack_b(corrupt, limits=Limits(max_array=1024))
+    assert (e.value.limit, e.value.value, e.value.bound) == ("max_array", 0xFFFFFFFF, 1024)
+    with pytest.raises(LimitExceeded):
+        Frame.unpack(io.BytesIO(corrupt), limits=Limits(max_array=1024))
+
+    ok = b"\x00\x00\x00\x02\x01\x02name\0"
+    assert Frame.unpack_b(ok, limits=Limits(max_array=2, max_string=4, max_record=11)).name == b"name"
+    with pytest.raises(LimitExceeded):
+        Frame.unpack_b(ok, limits=Limits(max_string=3))
+    with pytest.raises(LimitExceeded):
+        Frame.unpack(io.BytesIO(ok), limits=Limits(max_string=3))
+    with pytest.raises(LimitExceeded):
+        Frame.unpack_b(ok, limits=Limits(max_record=10))
+    # an unterminated cstring at the end of a stream used to loop forever
+    with pytest.raises(struct.error):
+        Frame.unpack(io.BytesIO(ok[:-1]))
+
+    class Limited(Frame):
+        _limits = Limits(max_array=1)
+
+    with pytest.raises(LimitExceeded):
+        Limited.unpack_b(ok)
+    with pytest.raises(LimitExceeded):
+        list(Limited.iter_unpack(io.BytesIO(ok)))
+    with pytest.raises(LimitExceeded):
+        Limited.unpack_into(Limited(), ok)
+    with pytest.raises(LimitExceeded):
+        Limited.unpack_into(Limited(), io.BytesIO(ok))
+    assert Limited.unpack_b(ok, limits=Limits()).payload == [1, 2]
+
+    async def from_reader(data: bytes, limits: Optional[Any] = None) -> Any:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await Limited.unpack_async(reader, limits=limits)
+
+    with pytest.raises(LimitExceeded):
+        asyncio.run(from_reader(ok))
+    assert asyncio.run(from_reader(ok, Limits())).name == b"name"
+    with pytest.raises(LimitExceeded):
+        asyncio.run(from_reader(ok, Limits(max_record=10)))
+
+    # max_record bounds what is read, not just the record decoded
+    endless = b"\x00\x00\x00\x00" + b"x" * 1_000_000
+    with pytest.raises(LimitExceeded):
+        Frame.unpack_b(endless, limits=Limits(max_record=16))
+    stream = io.BytesIO(endless)
+    with pytest.raises(LimitExceeded):
+        Frame.unpack(stream, limits=Limits(max_record=16))
+    assert stream.tell() <= 16
+
+    class Leaf(Struct):
+        x: Tag[int, "u8"]
+
+    class Middle(Struct):
+        leaf: Tag[Leaf, Leaf]
+
+    class Root(Struct):
+        middle: Tag[Middle, Middle]
+
+    assert Root.unpack_b(b"\x07", limits=Limits(max_depth=2)).middle.leaf.x == 7
+    with pytest.raises(LimitExceeded):
+        Root.unpack_b(b"\x07", limits=Limits(max_depth=1))
+    with pytest.raises(LimitExceeded):
+        list(Root.iter_unpack_b(b"\x07", reuse=True, limits=Limits(max_depth=1)))
+
+def test_conditional_fields():
+    from struc2 import If
+
+    class Header(Struct):
+        version: Tag[int, "u8"]
+
+    class Packet(Struct):
+        header: Tag[Header, Header]
+        flags: Tag[int, "u8"]
+        seq: Tag[Optional[int], If["flags", 0x04], "u32"]
+        ext: Tag[Optional[list[int]], If["header.version", ">=", 2], 2, "[]", "u8"]
+        kind: Tag[Optional[int], If["flags", "in", (1, 3)], "u8"]
+        tail: Tag[int, "u8"]
+
+    p = Packet.unpack_b(b"\x02\x04\x00\x00\x00\x07\x0a\x0b\xff")
+    assert (p.seq, p.ext, p.kind, p.tail) == (7, [10, 11], None, 0xFF)
+    p = Packet.unpack_b(b"\x01\x03\x09\xff")
+    assert (p.seq, p.ext, p.kind, p.tail) == (None, None, 9, 0xFF)
+    assert Packet.unpack(io.BytesIO(b"\x01\x03\x09\xff")).kind == 9
+    assert p.pack() == b"\x01\x03\x09\xff"
+
+    data = b"\x02\x04\x00\x00\x00\x07\x0a\x0b\xff\x01\x00\xfe"
+    assert [r.tail for r in Packet.iter_unpack_b(data, fields=["tail"])] == [0xFF, 0xFE]
+    assert [r.seq for r in Packet.iter_unpack(io.BytesIO(data), where=lambda r: r.flags & 0x04)] == [7]
+    class Bad(Struct):
+        flags: Tag[int, "u8"]
+        x: Tag[Optional[int], If["flags", "~", 1], "u8"]
+
+    with pytest.raises(ValueError):
+        Bad.unpack_b(b"\x01\x02")
+
+def test_rest_array_and_frames():
+    from struc2 import Frame
+
+    class Tail(Struct):
+        kind: Tag[int, "u8"]
+        samples: Tag[list[int], "rest[]", "u16"]
+
+    assert Tail.unpack_b(b"\x01\x00\x01\x00\x02").samples == [1, 2]
+    assert Tail.unpack(io.BytesIO(b"\x01\x00\x01\x00\x02\x00\x03")).samples == [1, 2, 3]
+    assert Tail.unpack_b(b"\x01").samples == []
+    with pytest.raises(struct.error):
+        Tail.unpack_b(b"\x01\x00\x01\x00")
+
+    class Names(Struct):
+        names: Tag[list[bytes], "rest[]", "cstring"]
+
+    class Container(Struct):
+        size: Tag[int, "u8"]
+        body: Tag[Tail, Frame["size"], Tail]
+        names_size: Tag[int, "u8"]
+        names: Tag[Names, Frame["names_size"], Names]
+        crc: Tag[int, "u8"]
+
+    data = b"\x05\x01\x00\x01\x00\x02" + b"\x06ab\0cd\0" + b"\xcc"
+    for c in (Container.unpack_b(data), Container.unpack(io.BytesIO(data))):
+        assert (c.body.samples, c.names.names, c.crc) == ([1, 2], [b"ab", b"cd"], 0xCC)
+    assert Container.unpack_b(data).pack() == data
+    assert [c.crc for c in Container.iter_unpack_b(data * 2, fields=["crc"])] == [0xCC, 0xCC]
+    with pytest.raises(struct.error):
+        Container.unpack_b(data[:4])
+
+    # decoded in blocks a record running to the end would end at a block boundary
+    assert [c.crc for c in Container.iter_unpack_compressed(io.BytesIO(zlib.compress(data * 2)), "zlib", block_size=3)] == [0xCC, 0xCC]
+    with pytest.raises(ValueError):
+        Tail.iter_unpack_compressed(io.BytesIO(zlib.compress(data)), "zlib")
+
+    class Wrapped(Struct):
+        tail: Tag[Tail, Tail]
+
+    async def batches() -> Any:
+        reader = asyncio.StreamReader()
+        reader.feed_eof()
+        return [b async for b in Wrapped.aiter_unpack(reader)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(batches())
+
+def test_backends():
+    from struc2 import Backend
+
+    class Reading(Struct):
+        sensor: Tag[int, "u16"]
+        value: Tag[float, "f32"]
+        raw: Tag[int, LittleEndian, "u32"]
+        label: Tag[bytes, "cstring"]
+        scale: Tag[int, "u8"]
+
+    data = struct.pack(">Hf", 3, 1.5) + struct.pack("<I", 9) + b"abc\0\x02"
+    expected = vars(Reading.unpack_b(data))
+    assert Reading.backend() == "interpreted"
+    assert Backend.eligible(Reading) == ["interpreted", "fused", "codegen"]
+    steps = [(s is not None, names) for s, names, _ in Backend.plan(Reading._get_tags())]
+    assert steps == [(True, ["sensor", "value"]), (True, ["raw"]), (False, ["label"]), (True, ["scale"])]
+
+    for name in ("fused", "codegen"):
+        class Pinned(Reading):
+            _backend = name
+        assert Pinned.backend() == name and vars(Pinned.unpack_b(data)) == expected
+        assert [vars(r) for r in Pinned.iter_unpack_b(data * 2)] == [expected, expected]
+
+    timings = Reading.calibrate(data, number=50)
+    assert set(timings) == {"interpreted", "fused", "codegen"}
+    assert Reading.backend() == min(timings, key=timings.__getitem__)
+    assert vars(Reading.unpack_b(data)) == expected
+
+    # records compare by their bytes: nested structs and NaN
+    class Point(Struct):
+        x: Tag[int, "u8"]
+
+    class Located(Struct):
+        at: Tag[Point, Point]
+        value: Tag[float, "f64"]
+
+    nan = b"\x01" + struct.pack(">d", float("nan"))
+    assert set(Located.calibrate(nan, number=10)) == {"interpreted", "fused", "codegen"}
+
+    class Checked(Struct):
+        x: Tag[int, "u8"]
+        crc: Tag[int, Checksum["sum8"], "u8"] # type: ignore
+
+    assert Backend.eligible(Checked) == ["interpreted"]
+    class CheckedCodegen(Checked):
+        _backend = "codegen"
+
+    class Unknown(Reading):
+        _backend = "simd"
+
+    with pytest.raises(ValueError):
+        CheckedCodegen.unpack_b(b"\x01\x01")
+    with pytest.raises(ValueError):
+        Unknown.unpack_b(data)
+
 def test_benchmark_normal(benchmark: Any):
     class A(Struct):
         x: Tag[int, "u16"]
@@ -359,4 +1464,113 @@ def test_benchmark_dv_dtr(benchmark: Any):
         a: Tag[int, "u8"]
 
     inp = b'\xAB\xBA\xAB\xBA123\0\xAA'
-    benchmark.pedantic(A.unpack_b, args=(inp,), iterations=4, rounds=1000)
\ No newline at end of file
+    benchmark.pedantic(A.unpack_b, args=(inp,), iterations=4, rounds=1000)
+
+
+class RingSample(Struct):
+    seq: Tag[int, "u32"]
+    value: Tag[float, "f64"]
+    name: Tag[bytes, "cstring"]
+
+    def __init__(self, seq: int = 0, value: float = 0.0, name: bytes = b""):
+        self.seq, self.value, self.name = seq, value, name
+
+def test_benchmark_ring(benchmark: Any):
+    records = [RingSample(seq=i, value=i / 2, name=b"sensor") for i in range(100)]
+    with Ring(RingSample) as ring:
+        def round_trip():
+            ring.push_many(records)
+            return ring.pop_many()
+        assert len(benchmark.pedantic(round_trip, iterations=4, rounds=100)) == 100
+
+def test_benchmark_queue_pickle(benchmark: Any):
+    records = [RingSample(seq=i, value=i / 2, name=b"sensor") for i in range(100)]
+    queue: Any = multiprocessing.Queue()
+    def round_trip():
+        for r in records:
+            queue.put(r)
+        return [queue.get() for _ in records]
+    assert len(benchmark.pedantic(round_trip, iterations=4, rounds=100)) == 100
+    queue.close()
+
+class ColumnSample(Struct):
+    seq: Tag[int, LittleEndian, "u32"]
+    value: Tag[float, LittleEndian, "f64"]
+    flags: Tag[int, LittleEndian, "u16"]
+
+COLUMNS = {"seq": list(range(10_000)), "value": [i / 2 for i in range(10_000)], "flags": [i & 0xFF for i in range(10_000)]}
+
+def test_benchmark_pack_many(benchmark: Any):
+    assert len(benchmark(ColumnSample.pack_many, COLUMNS)) == 14 * 10_000
+
+def test_benchmark_pack_records(benchmark: Any):
+    records = []
+    for seq, value, flags in zip(*COLUMNS.values()):
+        r = ColumnSample()
+        r.seq, r.value, r.flags = seq, value, flags
+        records.append(r)
+    assert len(benchmark(lambda: b"".join([r.pack() for r in records]))) == 14 * 10_000
+
+ADC_SAMPLES = struct.pack("<4096H", *range(4096))
+
+def test_benchmark_dv_per_element(benchmark: Any):
+    class Adc(Struct):
+        samples: Tag[list[float], 4096, "[]", DV[lambda v: v * 0.01 - 40.0], LittleEndian, "u16"]
+    assert len(benchmark(Adc.unpack_b, ADC_SAMPLES).samples) == 4096
+
+def test_benchmark_affine(benchmark: Any):
+    from struc2 import Affine
+    class Adc(Struct):
+        samples: Tag[list[float], 4096, "[]", Affine[0.01, -40.0], LittleEndian, "u16"]
+    assert len(benchmark(Adc.unpack_b, ADC_SAMPLES).samples) == 4096
+
+class ConfigFrame(Struct):
+    _decode_cache = True
+    device: Tag[int, "u32"]
+    mode: Tag[int, "u8"]
+    name: Tag[bytes, "cstring"]
+    thresholds: Tag[list[int], 8, "[]", "u16"]
+
+CONFIG_FRAME = struct.pack(">IB", 7, 2) + b"sensor-07\0" + struct.pack(">8H", *range(8))
+
+def test_benchmark_decode_uncached(benchmark: Any):
+    assert benchmark(ConfigFrame.unpack_b, CONFIG_FRAME, cache=False).device == 7
+
+def test_benchmark_decode_cached(benchmark: Any):
+    assert benchmark(ConfigFrame.unpack_b, CONFIG_FRAME).device == 7
+
+OPTIONAL_FRAME = b"\x04\x00\x00\x00\x07\x2a"
+
+def test_benchmark_optional_dtr(benchmark: Any):
+    class Frame(Struct):
+        def seq_tags(self) -> Optional[list[Any]]:
+            return ["u32"] if self.flags & 0x04 else None
+
+        flags: Tag[int, "u8"]
+        seq: Tag[Optional[int], DTR[seq_tags]]
+        value: Tag[int, "u8"]
+    assert benchmark(Frame.unpack_b, OPTIONAL_FRAME).seq == 7
+
+def test_benchmark_optional_if(benchmark: Any):
+    from struc2 import If
+    class Frame(Struct):
+        flags: Tag[int, "u8"]
+        seq: Tag[Optional[int], If["flags", 0x04], "u32"]
+        value: Tag[int, "u8"]
+    assert benchmark(Frame.unpack_b, OPTIONAL_FRAME).seq == 7
+
+class Telemetry(Struct):
+    seq: Tag[int, LittleEndian, "u32"]
+    timestamp: Tag[int, LittleEndian, "u64"]
+    x: Tag[float, LittleEndian, "f32"]
+    y: Tag[float, LittleEndian, "f32"]
+    z: Tag[float, LittleEndian, "f32"]
+    status: Tag[int, LittleEndian, "u16"]
+
+TELEMETRY = struct.pack("<IQfffH", 1, 2, 0.5, 1.5, 2.5, 7)
+
+@pytest.mark.parametrize("backend", ["interpreted", "fused", "codegen"])
+def test_benchmark_backend(benchmark: Any, backend: str):
+    class Pinned(Telemetry):
+        _backend = backend
+    assert benchmark(Pinned.unpack_b, TELEMETRY).status == 7